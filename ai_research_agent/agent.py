@@ -6,6 +6,7 @@ import json # Import json library
 import os # Import os library
 import matplotlib.pyplot as plt # Import plotting library
 import sqlite3 # Import SQLite library
+from agents.scheduler import default_scheduler # Shared rate limiter for external APIs
 
 class AIResearchAgent:
     def __init__(self, name: str, openai_api_key: str, db_filepath: str):
@@ -119,14 +120,14 @@ class AIResearchAgent:
         """Interact with the OpenAI model."""
         self.logger.info(f"Interacting with model: {model_name} with prompt: '{prompt[:50]}...'")
         try:
-            response = self.openai_client.chat.completions.create(
+            response = default_scheduler().call("api.openai.com", lambda: self.openai_client.chat.completions.create(
                 model=model_name,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant."},
                     {"role": "user", "content": prompt}
                 ],
                 **parameters
-            )
+            ))
             result_content = response.choices[0].message.content
             usage = response.usage.to_dict()
             self.logger.info(f"Model interaction successful. Usage: {usage}")
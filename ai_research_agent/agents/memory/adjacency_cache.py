@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# (triple id, subject id, predicate id, object id, subject, predicate, object, metadata json)
+DecodedEdge = Tuple[int, int, int, int, str, str, str, str]
+
+# Rough per-edge overhead of the tuple and its ints, on top of the string payloads
+EDGE_OVERHEAD = 200
+ENTRY_OVERHEAD = 100
+
+def edges_nbytes(edges: List[DecodedEdge]) -> int:
+    return ENTRY_OVERHEAD + sum(
+        EDGE_OVERHEAD + len(edge[4]) + len(edge[5]) + len(edge[6]) + len(edge[7] or "") for edge in edges
+    )
+
+class AdjacencyCache:
+    """
+    In-process LRU of decoded edge lists keyed by node id, bounded by an approximate
+    memory size rather than an entry count. Writers invalidate the nodes they touch.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._lru: "OrderedDict[int, Tuple[List[DecodedEdge], int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, node_id: int) -> Optional[List[DecodedEdge]]:
+        entry = self._lru.get(node_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._lru.move_to_end(node_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, node_id: int, edges: List[DecodedEdge]) -> None:
+        size = edges_nbytes(edges)
+        if size > self.max_bytes:
+            return
+        self._discard(node_id)
+        self._lru[node_id] = (edges, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._lru.popitem(last=False)
+            self.nbytes -= evicted
+            self.evictions += 1
+
+    def _discard(self, node_id: int) -> bool:
+        entry = self._lru.pop(node_id, None)
+        if entry is None:
+            return False
+        self.nbytes -= entry[1]
+        return True
+
+    def invalidate(self, node_ids: Iterable[int]) -> None:
+        if not self._lru:
+            return
+        for node_id in node_ids:
+            if self._discard(node_id):
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._lru.clear()
+        self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "nodes": len(self._lru),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
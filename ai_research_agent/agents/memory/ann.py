@@ -0,0 +1,146 @@
+from array import array
+from typing import List, Optional, Sequence, Tuple
+import os
+import numpy as np
+from agents.memory.index import EmbeddingIndex, normalize_rows, top_k_indices
+
+class IVFIndex(EmbeddingIndex):
+    """
+    Approximate nearest-neighbour index (IVF-flat) over the same pre-normalized float32
+    matrix as EmbeddingIndex. Rows are assigned to the nearest of nlist spherical k-means
+    centroids and a query scores only the rows in its nprobe closest lists, so nprobe is
+    the recall/latency knob. Below train_size rows the index searches exactly.
+    """
+
+    def __init__(self, dim: Optional[int] = None, nlist: Optional[int] = None, nprobe: int = 8,
+                 train_size: int = 10000, retrain_factor: float = 4.0, capacity: int = 1024):
+        super().__init__(dim=dim, capacity=capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_size = train_size
+        self.retrain_factor = retrain_factor
+        self.trained_size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[array] = []
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _nearest(self, vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+        assign = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), block):
+            assign[start:start + block] = np.argmax(vectors[start:start + block] @ self.centroids.T, axis=1)
+        return assign
+
+    def _append_to_lists(self, positions: np.ndarray, assign: np.ndarray) -> None:
+        order = np.argsort(assign, kind="stable")
+        lists, starts = np.unique(assign[order], return_index=True)
+        for c, members in zip(lists, np.split(positions[order], starts[1:])):
+            self._lists[c].extend(members.tolist())
+
+    def train(self, iterations: int = 10, max_samples: int = 100000, seed: int = 0) -> None:
+        """
+        Fit centroids on a sample of the stored rows and rebuild every inverted list.
+        """
+        vectors = self._matrix[:self.size]
+        nlist = self.nlist or int(np.clip(np.sqrt(self.size), 16, 4096))
+        nlist = min(nlist, self.size)
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(self.size, min(self.size, max_samples), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            # Re-seed empty lists from random sample rows
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            self.centroids = normalize_rows(sums)
+        self._lists = [array("q") for _ in range(nlist)]
+        self._append_to_lists(np.arange(self.size), self._nearest(vectors))
+        self.trained_size = self.size
+
+    def add(self, rowids: Sequence[int], embeddings) -> int:
+        start = self.size
+        added = super().add(rowids, embeddings)
+        if not added:
+            return 0
+        if not self.trained:
+            if self.size >= self.train_size:
+                self.train()
+        elif self.size >= self.trained_size * self.retrain_factor:
+            self.train()
+        else:
+            self._append_to_lists(np.arange(start, self.size), self._nearest(self._matrix[start:self.size]))
+        return added
+
+    def search(self, query: Sequence[float], top_k: int, rowids: Optional[Sequence[int]] = None,
+               nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        # Pre-filtered candidate sets are scored exactly
+        if not self.trained or rowids is not None:
+            return super().search(query, top_k, rowids=rowids)
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (self.dim,):
+            return []
+        q = normalize_rows(q)
+        probes = top_k_indices(self.centroids @ q, nprobe or self.nprobe)
+        candidates = np.concatenate([np.frombuffer(self._lists[c], dtype=np.int64) for c in probes])
+        scores = self._matrix[candidates] @ q
+        idx = top_k_indices(scores, top_k)
+        return [(int(self._rowids[candidates[i]]), float(scores[i])) for i in idx]
+
+    def recall_at_k(self, queries: Optional[np.ndarray] = None, k: int = 10, sample: int = 100,
+                    nprobe: Optional[int] = None, seed: int = 0) -> float:
+        """
+        Mean fraction of the exact top-k that the approximate search returns. Defaults to
+        using a random sample of stored rows as queries.
+        """
+        if self.size == 0:
+            return 1.0
+        if queries is None:
+            rng = np.random.default_rng(seed)
+            queries = self._matrix[rng.choice(self.size, min(sample, self.size), replace=False)]
+        hits = 0
+        for q in queries:
+            exact = {rowid for rowid, _ in EmbeddingIndex.search(self, q, k)}
+            approx = {rowid for rowid, _ in self.search(q, k, nprobe=nprobe)}
+            hits += len(exact & approx) / max(len(exact), 1)
+        return hits / len(queries)
+
+    def save(self, path: str) -> None:
+        assign = np.full(self.size, -1, dtype=np.int64)
+        for c, members in enumerate(self._lists):
+            assign[np.frombuffer(members, dtype=np.int64)] = c
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            vectors=self._matrix[:self.size] if self.size else np.empty((0, self.dim or 0), dtype=np.float32),
+            rowids=self._rowids[:self.size],
+            assign=assign,
+            centroids=self.centroids if self.trained else np.empty((0, self.dim or 0), dtype=np.float32),
+            meta=np.array([self.last_rowid, self.nprobe, self.train_size, self.trained_size], dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "IVFIndex":
+        data = np.load(path)
+        vectors = data["vectors"]
+        last_rowid, nprobe, train_size, trained_size = (int(x) for x in data["meta"])
+        kwargs.setdefault("nprobe", nprobe)
+        kwargs.setdefault("train_size", train_size)
+        index = cls(dim=vectors.shape[1] or None, capacity=max(len(vectors), 1024), **kwargs)
+        if len(vectors):
+            index._reserve(len(vectors))
+            index._matrix[:len(vectors)] = vectors
+            index._rowids[:len(vectors)] = data["rowids"]
+            index.size = len(vectors)
+        index.last_rowid = last_rowid
+        if len(data["centroids"]):
+            index.centroids = data["centroids"]
+            index.trained_size = trained_size
+            index._lists = [array("q") for _ in range(len(index.centroids))]
+            index._append_to_lists(np.arange(index.size), data["assign"])
+        return index
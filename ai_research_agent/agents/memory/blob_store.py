@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, Optional
+import hashlib
+import sqlite3
+import zlib
+
+REF_PREFIX = "blob:"
+
+def is_ref(value) -> bool:
+    return isinstance(value, str) and len(value) == len(REF_PREFIX) + 64 and value.startswith(REF_PREFIX)
+
+class BlobStore:
+    """
+    Content-addressed store for large text payloads. Values of at least threshold
+    characters are kept once in the blobs table, keyed by their sha256, optionally
+    zlib-compressed, and referenced elsewhere as "blob:<sha256>".
+    """
+
+    def __init__(self, conn: sqlite3.Connection, threshold: int = 1024, compress: bool = True):
+        self.conn = conn
+        self.threshold = threshold
+        self.compress = compress
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def ref(value: str) -> str:
+        return REF_PREFIX + hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    def put(self, value: str) -> str:
+        """
+        Store value (if not already present) and return its reference. Runs inside the
+        caller's transaction.
+        """
+        ref = self.ref(value)
+        data = value.encode("utf-8")
+        compressed = 0
+        if self.compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                data, compressed = packed, 1
+        self.conn.execute(
+            "INSERT OR IGNORE INTO blobs (hash, data, compressed, size) VALUES (?, ?, ?, ?)",
+            (ref[len(REF_PREFIX):], data, compressed, len(value))
+        )
+        return ref
+
+    def maybe_put(self, value):
+        # Small values, non-strings and existing references are stored inline
+        if isinstance(value, str) and len(value) >= self.threshold and not is_ref(value):
+            return self.put(value)
+        return value
+
+    def maybe_ref(self, value):
+        # Reference a large value would be stored under, without storing it
+        if isinstance(value, str) and len(value) >= self.threshold and not is_ref(value):
+            return self.ref(value)
+        return value
+
+    def get_many(self, refs: Iterable[str]) -> Dict[str, str]:
+        refs = [ref for ref in dict.fromkeys(refs) if is_ref(ref)]
+        values = {}
+        for start in range(0, len(refs), 500):
+            chunk = refs[start:start + 500]
+            cur = self.conn.execute(
+                f"SELECT hash, data, compressed FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})",
+                [ref[len(REF_PREFIX):] for ref in chunk]
+            )
+            for digest, data, compressed in cur.fetchall():
+                values[REF_PREFIX + digest] = (zlib.decompress(data) if compressed else data).decode("utf-8")
+        return values
+
+    def get(self, ref: str) -> Optional[str]:
+        return self.get_many([ref]).get(ref)
+
+    def resolve(self, value):
+        # Return the stored payload for a reference, or the value itself if it is inline
+        if not is_ref(value):
+            return value
+        resolved = self.get(value)
+        return value if resolved is None else resolved
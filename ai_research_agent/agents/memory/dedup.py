@@ -0,0 +1,157 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import re
+import sqlite3
+import time
+import zlib
+import numpy as np
+
+WORD_RE = re.compile(r"\w+")
+
+class MinHashIndex:
+    """
+    Near-duplicate detector: MinHash signatures over word shingles, bucketed with LSH
+    (bands of rows_per_band hash values) so a lookup only compares against texts that
+    share a band. Signatures are kept in memory and persisted in the minhash_signatures
+    table under a namespace, so the index is rebuilt on start without re-reading texts.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, namespace: str, threshold: float = 0.9, num_perm: int = 128,
+                 bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.conn = conn
+        self.namespace = namespace
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        # Multiply-shift hash family: h(x) = (a * x + b) >> 32 with odd a, over 64-bit wraparound
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(0, 2 ** 62, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 2 ** 62, size=num_perm, dtype=np.uint64)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        # Added since the last save()
+        self._pending: Dict[str, np.ndarray] = {}
+        self.lookups = 0
+        self.duplicates = 0
+        self.lookup_time = 0.0
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                namespace TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (namespace, item_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+        cur = self.conn.execute("SELECT item_id, signature FROM minhash_signatures WHERE namespace = ?", (namespace,))
+        for item_id, blob in cur:
+            signature = np.frombuffer(blob, dtype="<u4")
+            if len(signature) == num_perm:
+                self._insert(item_id, signature)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._signatures
+
+    def shingles(self, text: str) -> np.ndarray:
+        # crc32 of each run of shingle_size lower-cased words; short texts are one shingle
+        words = WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        if len(words) <= k:
+            grams = [" ".join(words)]
+        else:
+            grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+        return np.fromiter({zlib.crc32(gram.encode("utf-8")) for gram in grams}, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        hashed = (np.outer(self.shingles(text), self._a) + self._b) >> np.uint64(32)
+        return hashed.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def _insert(self, item_id: str, signature: np.ndarray) -> None:
+        self._signatures[item_id] = signature
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(item_id)
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        """
+        The most similar indexed item as (item_id, estimated Jaccard similarity) if it
+        reaches the threshold, else None.
+        """
+        start = time.perf_counter()
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        best: Optional[Tuple[str, float]] = None
+        for item_id in candidates:
+            similarity = float(np.count_nonzero(self._signatures[item_id] == signature)) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (item_id, similarity)
+        self.lookups += 1
+        self.lookup_time += time.perf_counter() - start
+        if best is not None:
+            self.duplicates += 1
+        return best
+
+    def find(self, text: str) -> Optional[Tuple[str, float]]:
+        return self.query(self.signature(text))
+
+    def add(self, item_id: str, signature: np.ndarray) -> None:
+        """
+        Index an item in memory; its signature is persisted by the next save().
+        """
+        if item_id in self._signatures:
+            return
+        self._insert(item_id, signature)
+        self._pending[item_id] = signature
+
+    def save(self) -> int:
+        """
+        Write signatures added since the last save inside the caller's transaction.
+        """
+        pending, self._pending = self._pending, {}
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO minhash_signatures (namespace, item_id, signature) VALUES (?, ?, ?)",
+            [(self.namespace, item_id, signature.astype("<u4").tobytes()) for item_id, signature in pending.items()]
+        )
+        return len(pending)
+
+    def add_many(self, items: Iterable[Tuple[str, str]]) -> int:
+        # Index (item_id, text) pairs, e.g. rows written before the index existed
+        count = 0
+        for item_id, text in items:
+            if item_id not in self._signatures:
+                self.add(item_id, self.signature(text))
+                count += 1
+        return count
+
+    def discard(self, item_ids: Iterable[str]) -> None:
+        # Drop in-memory entries whose rows were rolled back
+        for item_id in item_ids:
+            self._pending.pop(item_id, None)
+            signature = self._signatures.pop(item_id, None)
+            if signature is None:
+                continue
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                members = bucket.get(key)
+                if members and item_id in members:
+                    members.remove(item_id)
+                    if not members:
+                        del bucket[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._signatures),
+            "lookups": self.lookups,
+            "duplicates": self.duplicates,
+            "mean_lookup_ms": 1000 * self.lookup_time / self.lookups if self.lookups else 0.0,
+            "threshold": self.threshold,
+        }
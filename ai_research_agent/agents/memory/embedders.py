@@ -0,0 +1,129 @@
+from typing import Dict, Optional, Protocol, Sequence, Tuple
+import hashlib
+import os
+import re
+import numpy as np
+from agents.scheduler import PRIORITY_INTERACTIVE, RequestScheduler, default_scheduler
+
+try:
+    import openai
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    openai.api_key = OPENAI_API_KEY
+except ImportError:
+    openai = None
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+TOKEN_RE = re.compile(r"\w+")
+
+class Embedder(Protocol):
+    name: str
+    dim: int
+    # Whether results are worth keeping in the persistent EmbeddingCache
+    cacheable: bool
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Return a (len(texts), dim) float32 matrix.
+        """
+        ...
+
+class OpenAIEmbedder:
+    cacheable = True
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dim: int = 1536, scheduler: Optional[RequestScheduler] = None,
+                 priority: int = PRIORITY_INTERACTIVE):
+        self.name = model
+        self.dim = dim
+        self.scheduler = scheduler or default_scheduler()
+        self.priority = priority
+
+    @staticmethod
+    def available() -> bool:
+        return bool(openai and openai.api_key)
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        response = self.scheduler.call("api.openai.com", lambda: openai.Embedding.create(
+            input=list(texts),
+            model=self.name
+        ), self.priority)
+        data = sorted(response["data"], key=lambda d: d["index"])
+        return np.asarray([d["embedding"] for d in data], dtype=np.float32)
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: signed feature hashing of lowercased word tokens into
+    dim buckets, sublinear term frequency, optional IDF weighting and L2 normalization.
+    Needs only NumPy and embeds whole batches with a few sparse array operations.
+    """
+    cacheable = False
+
+    def __init__(self, dim: int = 1536, sublinear_tf: bool = True, idf: Optional[np.ndarray] = None,
+                 chunk_size: int = 1024, max_features: int = 1_000_000):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self.sublinear_tf = sublinear_tf
+        self.idf = idf
+        self.chunk_size = chunk_size
+        self.max_features = max_features
+        self._features: Dict[str, Tuple[int, float]] = {}
+
+    def _feature(self, token: str) -> Tuple[int, float]:
+        # blake2b rather than hash() so buckets are stable across processes
+        feature = self._features.get(token)
+        if feature is None:
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            feature = (h % self.dim, 1.0 if h >> 63 else -1.0)
+            if len(self._features) >= self.max_features:
+                self._features.clear()
+            self._features[token] = feature
+        return feature
+
+    def _hash_tokens(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Returns (doc index, bucket, sign) for every token in the batch
+        tokens = [TOKEN_RE.findall(text.lower()) for text in texts]
+        lengths = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=len(tokens))
+        flat = [token for doc in tokens for token in doc]
+        if not flat:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+        # Hash each distinct token once per batch
+        unique, inverse = np.unique(np.array(flat), return_inverse=True)
+        features = [self._feature(token) for token in unique.tolist()]
+        cols = np.fromiter((f[0] for f in features), dtype=np.int64, count=len(features))
+        signs = np.fromiter((f[1] for f in features), dtype=np.float64, count=len(features))
+        docs = np.repeat(np.arange(len(texts)), lengths)
+        return docs, cols[inverse], signs[inverse]
+
+    def fit(self, texts: Sequence[str]) -> "HashingEmbedder":
+        """
+        Compute smoothed IDF weights per bucket from a reference corpus.
+        """
+        df = np.zeros(self.dim)
+        for start in range(0, len(texts), self.chunk_size):
+            chunk = texts[start:start + self.chunk_size]
+            docs, cols, _ = self._hash_tokens(chunk)
+            present = np.unique(docs * self.dim + cols)
+            df += np.bincount(present % self.dim, minlength=self.dim)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.chunk_size):
+            chunk = texts[start:start + self.chunk_size]
+            docs, cols, signs = self._hash_tokens(chunk)
+            # Aggregate sparsely over the (doc, bucket) pairs that occur, then scatter
+            keys, inverse = np.unique(docs * self.dim + cols, return_inverse=True)
+            values = np.bincount(inverse, weights=signs, minlength=len(keys))
+            if self.sublinear_tf:
+                values = np.sign(values) * np.log1p(np.abs(values))
+            if self.idf is not None:
+                values *= self.idf[keys % self.dim]
+            rows = keys // self.dim
+            norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(chunk)))
+            block = out[start:start + len(chunk)].reshape(-1)
+            block[keys] = values / np.maximum(norms[rows], 1e-8)
+        return out
+
+def default_embedder() -> Embedder:
+    return OpenAIEmbedder() if OpenAIEmbedder.available() else HashingEmbedder()
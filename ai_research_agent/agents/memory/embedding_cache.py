@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import hashlib
+import sqlite3
+import time
+import numpy as np
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by a hash of (model, text): an in-process LRU in
+    front of an SQLite table. Both tiers evict least-recently-used entries once they
+    exceed their size limit.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_memory_items: int = 10000, max_rows: int = 200000):
+        self.conn = conn
+        self.max_memory_items = max_memory_items
+        self.max_rows = max_rows
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                embedding BLOB,
+                last_used REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache (last_used)")
+        self.conn.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return content_hash(f"{model}\x00{text}")
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings; returns None for each text that is not cached.
+        """
+        keys = [self.key(model, text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                results[i] = self._lru[key]
+                self.memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(i)
+        if pending:
+            placeholders = ",".join("?" * len(pending))
+            cur = self.conn.execute(
+                f"SELECT key, embedding FROM embedding_cache WHERE key IN ({placeholders})",
+                list(pending)
+            )
+            found = []
+            for key, blob in cur.fetchall():
+                embedding = np.frombuffer(blob, dtype="<f4")
+                self._remember(key, embedding)
+                for i in pending[key]:
+                    results[i] = embedding
+                self.disk_hits += len(pending[key])
+                found.append(key)
+            if found:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany("UPDATE embedding_cache SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+            self.misses += sum(len(idx) for key, idx in pending.items() if key not in found)
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: np.ndarray) -> None:
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            key = self.key(model, text)
+            embedding = np.asarray(embedding, dtype="<f4")
+            self._remember(key, embedding)
+            rows.append((key, model, embedding.tobytes(), now))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (key, model, embedding, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            if count > self.max_rows:
+                excess = count - self.max_rows
+                self.conn.execute(
+                    "DELETE FROM embedding_cache WHERE key IN (SELECT key FROM embedding_cache ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._lru),
+            "evictions": self.evictions,
+        }
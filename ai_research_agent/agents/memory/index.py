@@ -0,0 +1,110 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        return vectors / (np.linalg.norm(vectors) + 1e-8)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / (norms + 1e-8)
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Return the indices of the top_k highest scores, best first.
+    """
+    if top_k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+class EmbeddingIndex:
+    """
+    Resident index of knowledge embeddings: one contiguous, pre-normalized float32
+    matrix plus the SQLite rowid of each row. Rows are appended in rowid order.
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 1024):
+        self.dim = dim
+        self.size = 0
+        self.last_rowid = 0
+        self._capacity = capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._rowids = np.empty(0, dtype=np.int64)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if self._matrix is not None and needed <= len(self._matrix):
+            return
+        capacity = max(self._capacity, len(self._rowids) * 2, needed)
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        rowids = np.empty(capacity, dtype=np.int64)
+        if self._matrix is not None:
+            matrix[:self.size] = self._matrix[:self.size]
+            rowids[:self.size] = self._rowids[:self.size]
+        self._matrix = matrix
+        self._rowids = rowids
+
+    def _prepare(self, rowids: Sequence[int], embeddings: Iterable[Sequence[float]]) -> Tuple[List[int], Optional[np.ndarray]]:
+        # Drop rows whose dimension does not match the index and normalize the rest
+        rowids = list(rowids)
+        if not rowids:
+            return [], None
+        vectors = [np.asarray(e, dtype=np.float32) for e in embeddings]
+        if self.dim is None:
+            self.dim = len(vectors[0])
+        keep = [i for i, v in enumerate(vectors) if v.shape == (self.dim,)]
+        self.last_rowid = max(self.last_rowid, max(rowids))
+        if not keep:
+            return [], None
+        return [rowids[i] for i in keep], normalize_rows(np.stack([vectors[i] for i in keep]))
+
+    def _store(self, block: np.ndarray) -> None:
+        self._matrix[self.size:self.size + len(block)] = block
+
+    def add(self, rowids: Sequence[int], embeddings: Iterable[Sequence[float]]) -> int:
+        """
+        Append embeddings for the given rowids; rows whose dimension does not match
+        the index are skipped. Returns the number of rows added.
+        """
+        kept, block = self._prepare(rowids, embeddings)
+        if block is None:
+            return 0
+        self._reserve(len(kept))
+        self._store(block)
+        self._rowids[self.size:self.size + len(kept)] = kept
+        self.size += len(kept)
+        return len(kept)
+
+    def positions(self, rowids: Sequence[int]) -> np.ndarray:
+        """
+        Map rowids to row positions in the matrix, dropping rowids that are not indexed.
+        """
+        rowids = np.asarray(rowids, dtype=np.int64)
+        stored = self._rowids[:self.size]
+        pos = np.searchsorted(stored, rowids)
+        keep = pos < self.size
+        pos, rowids = pos[keep], rowids[keep]
+        return pos[stored[pos] == rowids]
+
+    def search(self, query: Sequence[float], top_k: int, rowids: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Score every row (or only the given candidate rowids) against the query with one
+        matrix-vector product and return (rowid, cosine similarity) pairs for the top_k
+        rows, best first.
+        """
+        if self.size == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (self.dim,):
+            return []
+        if rowids is None:
+            scores = self._matrix[:self.size] @ normalize_rows(q)
+            idx = top_k_indices(scores, top_k)
+            return [(int(self._rowids[i]), float(scores[i])) for i in idx]
+        pos = self.positions(rowids)
+        scores = self._matrix[pos] @ normalize_rows(q)
+        idx = top_k_indices(scores, top_k)
+        return [(int(self._rowids[pos[i]]), float(scores[i])) for i in idx]
@@ -1,33 +1,128 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from agents.types import Agent, AgentRole, KnowledgeItem, Task, Message
+from agents.memory.index import EmbeddingIndex, normalize_rows, top_k_indices
+from agents.memory.ann import IVFIndex
+from agents.memory.quantization import Int8Index, PQIndex
+from agents.memory.embedding_cache import EmbeddingCache, content_hash
+from agents.memory.embedders import Embedder, HashingEmbedder, default_embedder
+from agents.memory.dedup import MinHashIndex
 import numpy as np
 import os
 import json
+import re
 import sqlite3
+import time
+import uuid
 
-try:
-    import openai
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    openai.api_key = OPENAI_API_KEY
-except ImportError:
-    openai = None
+# Metadata keys written by cli.py that get an indexed generated column (meta_<key>)
+FILTER_COLUMNS = ("topic", "source", "system_prompt", "loop")
+FTS_TOKEN_RE = re.compile(r"\w+")
+# embedder value of rows stored before the column existed: their vectors may be random
+# offline placeholders, so searches skip them until reembed() replaces them
+LEGACY_EMBEDDER = "legacy"
+HASHING_EMBEDDER_RE = re.compile(r"hashing-(\d+)$")
 
 def cosine_similarity(a, b):
     a = np.array(a)
     b = np.array(b)
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-8)
 
+def encode_embedding(embedding, embedding_format: str = "blob"):
+    # "blob" stores little-endian float32 bytes (6KB for 1536 dims vs ~30KB of JSON text)
+    if embedding_format == "json":
+        return json.dumps([float(x) for x in embedding])
+    return np.asarray(embedding, dtype="<f4").tobytes()
+
+def decode_embedding(value) -> np.ndarray:
+    # Reads both storage formats so migrated and unmigrated rows can coexist
+    if isinstance(value, (bytes, memoryview)):
+        return np.frombuffer(value, dtype="<f4")
+    return np.asarray(json.loads(value), dtype=np.float32)
+
+def migrate_embeddings(db_path: str, batch_size: int = 1000, vacuum: bool = True) -> int:
+    """
+    One-shot migration of JSON-text embeddings in the knowledge table to float32 BLOBs.
+    Returns the number of rows converted.
+    """
+    conn = sqlite3.connect(db_path)
+    converted = 0
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, embedding FROM knowledge WHERE rowid > ? AND typeof(embedding) = 'text' ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE knowledge SET embedding = ? WHERE rowid = ?",
+            [(encode_embedding(json.loads(emb)), rowid) for rowid, emb in rows]
+        )
+        conn.commit()
+        converted += len(rows)
+        last_rowid = rows[-1][0]
+    if vacuum and converted:
+        conn.execute("VACUUM")
+    conn.close()
+    return converted
+
 class MemoryAgent(Agent):
     role = AgentRole.MEMORY
 
-    def __init__(self, db_path: str = "ai_research_agent/knowledge.db"):
+    def __init__(self, db_path: str = "ai_research_agent/knowledge.db", embedding_format: str = "blob",
+                 embedder: Optional[Embedder] = None, index: str = "exact", index_save_every: int = 1000,
+                 block_size: int = 1024, near_duplicate_threshold: Optional[float] = None,
+                 index_options: Optional[Dict[str, Any]] = None):
         self.db_path = db_path
+        self.embedding_format = embedding_format
+        # OpenAI when a key is configured, otherwise the deterministic local hashing embedder
+        self.embedder = embedder or default_embedder()
+        self.fallback_embedder: Embedder = HashingEmbedder(dim=self.embedder.dim)
+        # Local embedders by name, for querying rows stored by a hashing embedder
+        self._local_embedders: Dict[str, Embedder] = {self.fallback_embedder.name: self.fallback_embedder}
         self.log: List[Dict[str, Any]] = []
+        # "exact" brute-force matrix, "ivf" approximate index persisted next to the DB, or
+        # "int8"/"pq" quantized indexes that re-rank on full-precision vectors read from SQLite,
+        # or "stream" to keep no resident index and scan the table in block_size chunks per query
+        self.index_kind = index
+        # Constructor arguments for the index, e.g. {"nlist": 1024, "nprobe": 16, "train_size": 50000}
+        # for "ivf" or {"m": 96} for "pq"; they take precedence over values saved with the index
+        self.index_options = dict(index_options or {})
+        self.block_size = block_size
+        # Approximate and quantized indexes are persisted next to the DB, e.g. knowledge.pq.npz
+        self.index_path = os.path.splitext(db_path)[0] + f".{index}.npz"
+        self.index_save_every = index_save_every
+        self._unsaved_rows = 0
         self._init_db()
+        self.index = self._load_index()
+        # Near-duplicate filtering is off by default (see enable_near_duplicates)
+        self.near_dupes: Optional[MinHashIndex] = None
+        if near_duplicate_threshold is not None:
+            self.enable_near_duplicates(near_duplicate_threshold)
+
+    def enable_near_duplicates(self, threshold: float = 0.9):
+        """
+        Link content whose MinHash similarity to a stored item reaches the threshold to that
+        item in knowledge_links instead of embedding and storing it. Loads the signature
+        index, signing rows stored while it was disabled; a no-op once enabled.
+        """
+        if self.near_dupes is not None:
+            return
+        self.near_dupes = MinHashIndex(self.conn, "knowledge", threshold=threshold)
+        rows = self.conn.execute(
+            "SELECT id, content FROM knowledge WHERE id NOT IN "
+            "(SELECT item_id FROM minhash_signatures WHERE namespace = 'knowledge')"
+        ).fetchall()
+        indexed = self.near_dupes.add_many((item_id, content or "") for item_id, content in rows)
+        with self.conn:
+            self.near_dupes.save()
+        if indexed:
+            self.log.append({"event": "near_duplicate_backfill", "rows": indexed})
 
     def _init_db(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        # Not thread-bound: the message bus runs this agent on its own worker thread
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.execute("""
             CREATE TABLE IF NOT EXISTS knowledge (
                 id TEXT PRIMARY KEY,
@@ -36,48 +131,547 @@ class MemoryAgent(Agent):
                 metadata TEXT
             )
         """)
+        # Content hashes back exact-duplicate detection; backfill rows written before the column existed
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_xinfo(knowledge)")]
+        if "content_hash" not in columns:
+            self.conn.execute("ALTER TABLE knowledge ADD COLUMN content_hash TEXT")
+        self.conn.create_function("sha256", 1, lambda text: content_hash(text or ""), deterministic=True)
+        self.conn.execute("UPDATE knowledge SET content_hash = sha256(content) WHERE content_hash IS NULL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_content_hash ON knowledge (content_hash)")
+        # Name of the embedder that produced each row: vectors from different embedders share a
+        # dimension but not a space, so each row is scored against a query vector from its own
+        # embedder. Rows stored before the column existed are marked legacy.
+        if "embedder" not in columns:
+            self.conn.execute("ALTER TABLE knowledge ADD COLUMN embedder TEXT")
+            self.conn.execute("UPDATE knowledge SET embedder = ?", (LEGACY_EMBEDDER,))
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_embedder ON knowledge (embedder)")
+        self.embedder_names = {row[0] for row in self.conn.execute("SELECT DISTINCT embedder FROM knowledge")}
+        # Virtual generated columns extract filterable metadata keys so where= filters use an index
+        for key in FILTER_COLUMNS:
+            if f"meta_{key}" not in columns:
+                self.conn.execute(
+                    f"ALTER TABLE knowledge ADD COLUMN meta_{key} GENERATED ALWAYS AS (json_extract(metadata, '$.{key}')) VIRTUAL"
+                )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_knowledge_meta_{key} ON knowledge (meta_{key})")
+        # Near-duplicates of a stored item are recorded against it rather than stored again
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS knowledge_links (
+                id INTEGER PRIMARY KEY,
+                canonical_id TEXT NOT NULL,
+                content_hash TEXT,
+                similarity REAL,
+                metadata TEXT,
+                created_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_knowledge_links_canonical_id ON knowledge_links (canonical_id)")
+        self.fts = self._init_fts()
         self.conn.commit()
+        self.cache = EmbeddingCache(self.conn)
+
+    def _init_fts(self) -> bool:
+        # FTS5 index over knowledge.content, kept in sync by triggers; skipped if SQLite lacks FTS5
+        try:
+            exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'knowledge_fts'").fetchone()
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(content, content='knowledge', content_rowid='rowid')"
+            )
+        except sqlite3.OperationalError as e:
+            self.log.append({"event": "fts_unavailable", "error": str(e)})
+            return False
+        self.conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+                INSERT INTO knowledge_fts (rowid, content) VALUES (new.rowid, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+                INSERT INTO knowledge_fts (knowledge_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE OF content ON knowledge BEGIN
+                INSERT INTO knowledge_fts (knowledge_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+                INSERT INTO knowledge_fts (rowid, content) VALUES (new.rowid, new.content);
+            END;
+        """)
+        if not exists:
+            self.conn.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+        return True
 
     def embed(self, content: str) -> List[float]:
-        if openai and openai.api_key:
+        return self._embed_matrix([content])[0].tolist()
+
+    def embed_many(self, contents: List[str], batch_size: int = 100) -> List[List[float]]:
+        """
+        Embed a list of strings, sending up to batch_size inputs per API request.
+        Texts already stored or in the embedding cache are not sent to the API.
+        """
+        return self._embed_matrix(contents, batch_size).tolist()
+
+    def _stored_embeddings(self, embedder: str, contents: List[str], chunk_size: int = 500) -> List[Optional[np.ndarray]]:
+        # Vectors of contents already stored by this embedder, looked up by content_hash
+        hashes = [content_hash(content) for content in contents]
+        unique = list(set(hashes))
+        found: Dict[str, np.ndarray] = {}
+        for start in range(0, len(unique), chunk_size):
+            chunk = unique[start:start + chunk_size]
+            cur = self.conn.execute(
+                f"SELECT content_hash, embedding FROM knowledge WHERE embedder = ? AND content_hash IN ({','.join('?' * len(chunk))})",
+                [embedder] + chunk
+            )
+            for h, embedding in cur.fetchall():
+                found[h] = decode_embedding(embedding)
+        return [found.get(h) for h in hashes]
+
+    def _embed_matrix(self, contents: List[str], batch_size: int = 100, fallback: bool = True,
+                      cache: bool = True) -> np.ndarray:
+        # With fallback=False an API failure is raised instead of answered with local vectors.
+        # Stored contents are answered from knowledge itself; the embedding cache holds the rest
+        # (queries and unstored text), so cache=False is passed for contents about to be stored
+        embedder = self.embedder
+        if not embedder.cacheable:
+            self.log.append({"event": "embedding", "method": embedder.name, "count": len(contents)})
+            return embedder.embed_batch(contents)
+        out = np.empty((len(contents), embedder.dim), dtype=np.float32)
+        stored = self._stored_embeddings(embedder.name, contents)
+        for i, embedding in enumerate(stored):
+            if embedding is not None:
+                out[i] = embedding
+        unstored = [i for i, embedding in enumerate(stored) if embedding is None]
+        if len(unstored) < len(contents):
+            self.log.append({"event": "embedding", "method": "knowledge", "count": len(contents) - len(unstored)})
+        cached = self.cache.get_many(embedder.name, [contents[i] for i in unstored]) if unstored else []
+        missing = [i for i, embedding in zip(unstored, cached) if embedding is None]
+        for i, embedding in zip(unstored, cached):
+            if embedding is not None:
+                out[i] = embedding
+        if len(missing) < len(unstored):
+            self.log.append({"event": "embedding", "method": "cache", "count": len(unstored) - len(missing)})
+        for start in range(0, len(missing), batch_size):
+            batch_idx = missing[start:start + batch_size]
+            batch = [contents[i] for i in batch_idx]
             try:
-                response = openai.Embedding.create(
-                    input=content,
-                    model="text-embedding-ada-002"
-                )
-                embedding = response["data"][0]["embedding"]
-                self.log.append({"event": "embedding", "method": "openai"})
-                return embedding
+                vectors = embedder.embed_batch(batch)
+                if cache:
+                    self.cache.put_many(embedder.name, batch, vectors)
+                self.log.append({"event": "embedding", "method": embedder.name, "count": len(batch)})
             except Exception as e:
+                # Local fallback vectors are never cached
                 self.log.append({"event": "embedding_error", "error": str(e)})
-        self.log.append({"event": "embedding", "method": "random"})
-        return list(np.random.rand(1536))
-
-    def embed_and_store(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
-        embedding = self.embed(content)
-        item_id = f"item_{np.random.randint(1e9)}"
-        item = KnowledgeItem(id=item_id, content=content, embedding=embedding, metadata=metadata)
-        # Store in DB
-        self.conn.execute(
-            "INSERT INTO knowledge (id, content, embedding, metadata) VALUES (?, ?, ?, ?)",
-            (item_id, content, json.dumps(embedding), json.dumps(metadata or {}))
+                if not fallback:
+                    raise
+                vectors = self.fallback_embedder.embed_batch(batch)
+                self.log.append({"event": "embedding", "method": self.fallback_embedder.name, "count": len(batch)})
+            out[batch_idx] = vectors
+        return out
+
+    def _query_embedder(self, name: str) -> Optional[Embedder]:
+        # The embedder that produced rows labelled name, if it can embed queries here
+        if name == self.embedder.name:
+            return self.embedder
+        embedder = self._local_embedders.get(name)
+        match = HASHING_EMBEDDER_RE.match(name)
+        if embedder is None and match:
+            embedder = self._local_embedders[name] = HashingEmbedder(dim=int(match.group(1)))
+        return embedder
+
+    def _embed_queries(self, query: str) -> List[Tuple[str, np.ndarray]]:
+        """
+        (embedder name, query vector) for every embedder with stored rows, so rows written
+        offline stay searchable after switching to the API and vice versa. Legacy rows,
+        embedders that are not available here and a failing API are skipped.
+        """
+        queries = []
+        for name in sorted(self.embedder_names - {LEGACY_EMBEDDER}):
+            embedder = self._query_embedder(name)
+            if embedder is None:
+                self.log.append({"event": "embedding_skipped", "embedder": name})
+                continue
+            try:
+                if embedder is self.embedder:
+                    vector = self._embed_matrix([query], fallback=False)[0]
+                else:
+                    vector = embedder.embed_batch([query])[0]
+                    self.log.append({"event": "embedding", "method": name, "count": 1})
+            except Exception as e:
+                self.log.append({"event": "embedding_error", "embedder": name, "error": str(e)})
+                continue
+            queries.append((name, vector))
+        return queries
+
+    def _embedder_where(self, name: str, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # No extra filter while every row comes from this embedder
+        if self.embedder_names <= {name}:
+            return where
+        return dict(where or {}, embedder=name)
+
+    def embed_and_store(self, content: str, metadata: Optional[Dict[str, Any]] = None, dedupe: bool = False) -> str:
+        return self.embed_and_store_many([content], [metadata], dedupe=dedupe)[0]
+
+    def embed_and_store_many(self, contents: List[str], metadatas: Optional[List[Optional[Dict[str, Any]]]] = None, dedupe: bool = False) -> List[str]:
+        """
+        Embed and store a batch of contents, writing all rows in a single transaction.
+        Returns the item ids in input order. With dedupe=True, content that is already
+        stored (or repeated within the batch) returns the existing item id instead.
+        With near-duplicate filtering enabled, content that near-duplicates a stored (or
+        earlier batch) item is not embedded: it is recorded in knowledge_links against that
+        item, whose id is returned.
+        If the embedding API fails nothing is stored and the error is raised, rather than
+        mixing local fallback vectors into the corpus.
+        """
+        if not contents:
+            return []
+        metadatas = metadatas or [None] * len(contents)
+        hashes = [content_hash(content) for content in contents]
+        item_ids: List[Optional[str]] = [None] * len(contents)
+        new = list(range(len(contents)))
+        if dedupe:
+            unique = list(set(hashes))
+            placeholders = ",".join("?" * len(unique))
+            cur = self.conn.execute(
+                f"SELECT content_hash, id FROM knowledge WHERE content_hash IN ({placeholders})",
+                unique
+            )
+            existing = dict(cur.fetchall())
+            first: Dict[str, int] = {}
+            for i, h in enumerate(hashes):
+                if h in existing:
+                    item_ids[i] = existing[h]
+                    self.log.append({"event": "embed_and_store_duplicate", "item_id": existing[h]})
+                else:
+                    # Keep only the first occurrence of content repeated within the batch
+                    first.setdefault(h, i)
+            new = sorted(first.values())
+        # Ids are assigned up front so later contents in the batch can link to earlier ones
+        for i in new:
+            item_ids[i] = f"item_{uuid.uuid4().hex}"
+        links: List[Tuple[int, str, float]] = []
+        signed: List[str] = []
+        if self.near_dupes is not None:
+            kept = []
+            for i in new:
+                signature = self.near_dupes.signature(contents[i])
+                match = self.near_dupes.query(signature)
+                if match is None:
+                    self.near_dupes.add(item_ids[i], signature)
+                    signed.append(item_ids[i])
+                    kept.append(i)
+                else:
+                    item_ids[i] = match[0]
+                    links.append((i, match[0], match[1]))
+            new = kept
+        rowids = []
+        try:
+            embeddings = self._embed_matrix([contents[i] for i in new], fallback=False, cache=False)
+            # Store in DB
+            with self.conn:
+                for i, embedding in zip(new, embeddings):
+                    cur = self.conn.execute(
+                        "INSERT INTO knowledge (id, content, embedding, metadata, content_hash, embedder) VALUES (?, ?, ?, ?, ?, ?)",
+                        (item_ids[i], contents[i], encode_embedding(embedding, self.embedding_format), json.dumps(metadatas[i] or {}), hashes[i],
+                         self.embedder.name)
+                    )
+                    rowids.append(cur.lastrowid)
+                if self.near_dupes is not None:
+                    self.near_dupes.save()
+                    self.conn.executemany(
+                        "INSERT INTO knowledge_links (canonical_id, content_hash, similarity, metadata, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [(canonical, hashes[i], similarity, json.dumps(metadatas[i] or {}), time.time())
+                         for i, canonical, similarity in links]
+                    )
+        except Exception:
+            # Rolled back: forget the signatures so nothing links to rows that do not exist
+            if self.near_dupes is not None:
+                self.near_dupes.discard(signed)
+            raise
+        if rowids:
+            self.embedder_names.add(self.embedder.name)
+        # Append to the resident index only if it already holds every earlier row;
+        # otherwise the next search picks the rows up in _sync_index.
+        if rowids and self.index.size and rowids[0] == self.index.last_rowid + 1 and rowids == list(range(rowids[0], rowids[0] + len(rowids))):
+            self.index.add(rowids, embeddings)
+            self._index_rows_added(len(rowids))
+        if dedupe:
+            stored = {hashes[i]: item_ids[i] for i in range(len(contents)) if item_ids[i] is not None}
+            for i, h in enumerate(hashes):
+                if item_ids[i] is None:
+                    item_ids[i] = stored[h]
+        for i, canonical, similarity in links:
+            self.log.append({"event": "embed_and_store_near_duplicate", "item_id": canonical, "similarity": similarity})
+        for i in new:
+            self.log.append({"event": "embed_and_store", "item_id": item_ids[i], "content": contents[i]})
+        return item_ids
+
+    def links(self, item_id: str) -> List[Dict[str, Any]]:
+        """
+        Near-duplicates recorded against a stored item, oldest first.
+        """
+        cur = self.conn.execute(
+            "SELECT content_hash, similarity, metadata, created_at FROM knowledge_links WHERE canonical_id = ? ORDER BY id",
+            (item_id,)
         )
-        self.conn.commit()
-        self.log.append({"event": "embed_and_store", "item_id": item_id, "content": content})
-        return item_id
+        return [
+            {"content_hash": h, "similarity": similarity, "metadata": json.loads(metadata or "{}"), "created_at": created_at}
+            for h, similarity, metadata, created_at in cur.fetchall()
+        ]
+
+    def _load_index(self) -> EmbeddingIndex:
+        if self.index_kind in ("exact", "stream"):
+            return EmbeddingIndex()
+        kinds = {
+            "ivf": (IVFIndex, {}),
+            "int8": (Int8Index, {"fetch": self._fetch_embeddings}),
+            "pq": (PQIndex, {"fetch": self._fetch_embeddings, "rerank_factor": 10}),
+        }
+        if self.index_kind not in kinds:
+            raise ValueError(f"Unknown index type: {self.index_kind}")
+        cls, kwargs = kinds[self.index_kind]
+        kwargs = dict(kwargs, **self.index_options)
+        if os.path.exists(self.index_path):
+            index = cls.load(self.index_path, **kwargs)
+            max_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM knowledge").fetchone()[0]
+            # A persisted index ahead of the DB belongs to a different knowledge.db
+            if index.last_rowid <= max_rowid:
+                self.log.append({"event": "index_load", "path": self.index_path, "index_size": index.size})
+                return index
+        return cls(**kwargs)
+
+    def recall_at_k(self, k: int = 10, sample: int = 100, nprobe: Optional[int] = None) -> float:
+        """
+        Recall@k of the ivf index against exact search, using a sample of stored rows as
+        queries, for tuning nprobe.
+        """
+        if not isinstance(self.index, IVFIndex):
+            raise ValueError(f"recall_at_k needs the ivf index, not {self.index_kind}")
+        self._sync_index()
+        return self.index.recall_at_k(k=k, sample=sample, nprobe=nprobe)
+
+    def _fetch_embeddings(self, rowids: np.ndarray) -> np.ndarray:
+        # Full-precision embeddings for re-ranking, one row per rowid (zeros if missing)
+        placeholders = ",".join("?" * len(rowids))
+        cur = self.conn.execute(
+            f"SELECT rowid, embedding FROM knowledge WHERE rowid IN ({placeholders})",
+            [int(rowid) for rowid in rowids]
+        )
+        found = {row[0]: decode_embedding(row[1]) for row in cur.fetchall()}
+        out = np.zeros((len(rowids), self.index.dim), dtype=np.float32)
+        for i, rowid in enumerate(rowids):
+            embedding = found.get(int(rowid))
+            if embedding is not None and embedding.shape == (self.index.dim,):
+                out[i] = embedding
+        return out
+
+    def _index_rows_added(self, count: int) -> None:
+        self._unsaved_rows += count
+        if self._unsaved_rows >= self.index_save_every:
+            self.save_index()
+
+    def save_index(self) -> None:
+        if isinstance(self.index, (IVFIndex, Int8Index, PQIndex)):
+            self.index.save(self.index_path)
+            self.log.append({"event": "index_save", "path": self.index_path, "index_size": self.index.size})
+        self._unsaved_rows = 0
+
+    def _sync_index(self) -> None:
+        # Load rows written since the index was last built (or all rows on first use), block_size
+        # rows at a time so quantized indexes never hold the full-precision corpus
+        cur = self.conn.execute(
+            "SELECT rowid, embedding FROM knowledge WHERE rowid > ? ORDER BY rowid",
+            (self.index.last_rowid,)
+        )
+        synced = 0
+        while True:
+            rows = cur.fetchmany(self.block_size)
+            if not rows:
+                break
+            self.index.add([row[0] for row in rows], [decode_embedding(row[1]) for row in rows])
+            synced += len(rows)
+        if synced:
+            self.log.append({"event": "index_sync", "rows": synced, "index_size": self.index.size})
+            self._index_rows_added(synced)
 
-    def semantic_search(self, query: str, top_k: int = 3) -> List[KnowledgeItem]:
-        query_emb = self.embed(query)
-        # Fetch all items from DB
-        cur = self.conn.execute("SELECT id, content, embedding, metadata FROM knowledge")
+    def _where_clause(self, where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """
+        Build an SQL condition matching rows whose metadata matches every key in where.
+        A value may be a scalar, None, or a list of allowed values.
+        """
+        clauses = []
+        params: List[Any] = []
+        for key, value in where.items():
+            if key == "embedder":
+                column = "embedder"
+            elif key in FILTER_COLUMNS:
+                column = f"meta_{key}"
+            else:
+                column = "json_extract(metadata, ?)"
+                params.append(f"$.{key}")
+            if value is None:
+                clauses.append(f"{column} IS NULL")
+            elif isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return " AND ".join(clauses), params
+
+    def _filter_rowids(self, where: Dict[str, Any]) -> List[int]:
+        clause, params = self._where_clause(where)
+        cur = self.conn.execute(f"SELECT rowid FROM knowledge WHERE {clause} ORDER BY rowid", params)
+        return [row[0] for row in cur.fetchall()]
+
+    def _stream_search(self, query_emb: np.ndarray, top_k: int, clause: str = "1=1",
+                       params: Sequence[Any] = ()) -> List[Tuple[int, float]]:
+        """
+        Score rows matching clause in block_size chunks read with fetchmany, keeping only a
+        running top_k, so peak memory does not grow with the size of the table.
+        """
+        q = normalize_rows(query_emb)
+        dim = len(q)
+        best_rowids = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        cur = self.conn.execute(f"SELECT rowid, embedding FROM knowledge WHERE {clause}", list(params))
+        while True:
+            rows = cur.fetchmany(self.block_size)
+            if not rows:
+                break
+            if all(isinstance(row[1], bytes) and len(row[1]) == dim * 4 for row in rows):
+                # Fast path: decode the whole block of float32 BLOBs with one frombuffer
+                rowids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+                block = np.frombuffer(b"".join(row[1] for row in rows), dtype="<f4").reshape(len(rows), dim)
+            else:
+                decoded = [(row[0], decode_embedding(row[1])) for row in rows]
+                decoded = [(rowid, emb) for rowid, emb in decoded if emb.shape == (dim,)]
+                if not decoded:
+                    continue
+                rowids = np.array([rowid for rowid, _ in decoded], dtype=np.int64)
+                block = np.stack([emb for _, emb in decoded])
+            scores = normalize_rows(block) @ q
+            best_rowids = np.concatenate([best_rowids, rowids])
+            best_scores = np.concatenate([best_scores, scores])
+            keep = top_k_indices(best_scores, top_k)
+            best_rowids, best_scores = best_rowids[keep], best_scores[keep]
+        return [(int(rowid), float(score)) for rowid, score in zip(best_rowids, best_scores)]
+
+    def semantic_search(self, query: str, top_k: int = 3, where: Optional[Dict[str, Any]] = None,
+                        stream: bool = False, nprobe: Optional[int] = None) -> List[KnowledgeItem]:
+        # nprobe overrides the ivf index's lists probed per query (recall vs latency)
+        search_kwargs = {"nprobe": nprobe} if nprobe is not None and isinstance(self.index, IVFIndex) else {}
+        hits: List[Tuple[int, float]] = []
+        if not (stream or self.index_kind == "stream"):
+            self._sync_index()
+        for embedder, query_emb in self._embed_queries(query):
+            # The caller's filter, plus the embedder filter once the table holds mixed vectors
+            scoped = self._embedder_where(embedder, where)
+            if stream or self.index_kind == "stream":
+                clause, params = self._where_clause(scoped) if scoped else ("1=1", [])
+                hits += self._stream_search(query_emb, top_k, clause, params)
+            else:
+                # Pre-filter on indexed metadata columns so only matching rows are scored
+                candidates = self._filter_rowids(scoped) if scoped else None
+                hits += self.index.search(query_emb, top_k, rowids=candidates, **search_kwargs) if candidates != [] else []
+        hits = sorted(hits, key=lambda hit: -hit[1])[:top_k]
+        self.log.append({"event": "semantic_search", "query": query, "top_k": top_k, "where": where, "stream": stream,
+                         "nprobe": nprobe})
+        return self._materialize(hits)
+
+    def hybrid_search(self, query: str, top_k: int = 3, candidates: int = 200,
+                      where: Optional[Dict[str, Any]] = None) -> List[KnowledgeItem]:
+        """
+        Lexical + vector retrieval: BM25 over the FTS5 index picks up to `candidates` rows,
+        which are then re-ranked by embedding similarity. Falls back to semantic_search
+        when FTS5 is unavailable or nothing matches lexically.
+        """
+        terms = FTS_TOKEN_RE.findall(query)
+        if not self.fts or not terms:
+            return self.semantic_search(query, top_k, where=where)
+        # Quote every term so user input is never parsed as FTS5 query syntax
+        match = " OR ".join('"' + term + '"' for term in terms)
+        cur = self.conn.execute(
+            "SELECT rowid FROM knowledge_fts WHERE knowledge_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, candidates)
+        )
+        rowids = {row[0] for row in cur.fetchall()}
+        if where:
+            rowids &= set(self._filter_rowids(where))
+        if not rowids:
+            return self.semantic_search(query, top_k, where=where)
+        placeholders = ",".join("?" * len(rowids))
+        by_embedder: Dict[str, List[int]] = {}
+        for rowid, embedder in self.conn.execute(
+            f"SELECT rowid, embedder FROM knowledge WHERE rowid IN ({placeholders}) ORDER BY rowid", list(rowids)
+        ):
+            by_embedder.setdefault(embedder, []).append(rowid)
+        if self.index_kind != "stream":
+            self._sync_index()
+        hits = []
+        # Each embedder's candidates are re-ranked with that embedder's query vector
+        for embedder, query_emb in self._embed_queries(query):
+            subset = by_embedder.get(embedder)
+            if not subset:
+                continue
+            if self.index_kind == "stream":
+                hits += self._stream_search(query_emb, top_k, f"rowid IN ({','.join('?' * len(subset))})", subset)
+            else:
+                hits += self.index.search(query_emb, top_k, rowids=subset)
+        hits = sorted(hits, key=lambda hit: -hit[1])[:top_k]
+        self.log.append({"event": "hybrid_search", "query": query, "top_k": top_k, "candidates": len(rowids), "where": where})
+        return self._materialize(hits)
+
+    def _materialize(self, hits) -> List[KnowledgeItem]:
+        # Build KnowledgeItems only for the winning (rowid, score) pairs, keeping their order
+        rows = {}
+        if hits:
+            placeholders = ",".join("?" * len(hits))
+            cur = self.conn.execute(
+                f"SELECT rowid, id, content, embedding, metadata FROM knowledge WHERE rowid IN ({placeholders})",
+                [rowid for rowid, sim in hits]
+            )
+            rows = {row[0]: row for row in cur.fetchall()}
         items = []
-        for row in cur.fetchall():
-            emb = json.loads(row[2])
-            sim = cosine_similarity(query_emb, emb)
-            items.append((sim, KnowledgeItem(id=row[0], content=row[1], embedding=emb, metadata=json.loads(row[3]))))
-        items.sort(reverse=True, key=lambda x: x[0])
-        self.log.append({"event": "semantic_search", "query": query, "top_k": top_k})
-        return [item for sim, item in items[:top_k]]
+        for rowid, sim in hits:
+            row = rows.get(rowid)
+            if row:
+                items.append(KnowledgeItem(id=row[1], content=row[2], embedding=decode_embedding(row[3]).tolist(), metadata=json.loads(row[4])))
+        return items
+
+    def migrate_embeddings(self, batch_size: int = 1000) -> int:
+        converted = migrate_embeddings(self.db_path, batch_size=batch_size)
+        self.log.append({"event": "migrate_embeddings", "rows": converted})
+        return converted
+
+    def reembed(self, embedder: str = LEGACY_EMBEDDER, batch_size: int = 100) -> int:
+        """
+        Replace the vectors of rows stored by another embedder (by default legacy rows) with
+        the configured embedder's, batch_size rows per API request and transaction, so
+        searches score them again. Raises if the API fails; finished batches are kept and a
+        rerun resumes. Returns the number of rows re-embedded.
+        """
+        updated = 0
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(
+                "SELECT rowid, content FROM knowledge WHERE embedder = ? AND rowid > ? ORDER BY rowid LIMIT ?",
+                (embedder, last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            vectors = self._embed_matrix([content or "" for _, content in rows], batch_size, fallback=False, cache=False)
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE knowledge SET embedding = ?, embedder = ? WHERE rowid = ?",
+                    [(encode_embedding(vector, self.embedding_format), self.embedder.name, rowid)
+                     for (rowid, _), vector in zip(rows, vectors)]
+                )
+            updated += len(rows)
+            last_rowid = rows[-1][0]
+        if updated:
+            self.embedder_names = {row[0] for row in self.conn.execute("SELECT DISTINCT embedder FROM knowledge")}
+            # The resident index holds the old vectors: rebuild it from the table on next search
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self.index = self._load_index()
+            self._unsaved_rows = 0
+        self.log.append({"event": "reembed", "embedder": embedder, "rows": updated})
+        return updated
 
     def receive_task(self, task: Task) -> None:
         self.log.append({"event": "receive_task", "task_id": task.id, "description": task.description})
@@ -91,4 +685,11 @@ class MemoryAgent(Agent):
         return {
             "role": self.role,
             "knowledge_count": count,
+            "embedding_cache": self.cache.stats(),
+            "near_duplicates": self.near_dupes.stats() if self.near_dupes is not None else None,
         }
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else "ai_research_agent/knowledge.db"
+    print(f"Converted {migrate_embeddings(path)} embeddings in {path} to float32 BLOBs.")
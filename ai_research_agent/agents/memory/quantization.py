@@ -0,0 +1,292 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+import os
+import numpy as np
+from agents.memory.index import EmbeddingIndex, normalize_rows, top_k_indices
+
+# Returns full-precision embeddings for the given rowids, one row per rowid
+FetchFn = Callable[[np.ndarray], np.ndarray]
+
+def _grow(array: Optional[np.ndarray], capacity: int, shape: Tuple[int, ...], dtype, size: int) -> np.ndarray:
+    grown = np.empty((capacity,) + shape, dtype=dtype)
+    if array is not None:
+        grown[:size] = array[:size]
+    return grown
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Plain (Euclidean) k-means; returns a (k, dim) float32 centroid matrix.
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        assign = np.argmax(data @ centroids.T - 0.5 * (centroids * centroids).sum(axis=1), axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1).astype(np.float32)[:, None]
+        centroids[empty] = data[rng.choice(len(data), int(empty.sum()))]
+    return centroids
+
+class QuantizedIndex(EmbeddingIndex):
+    """
+    Base for compressed indexes: rows are scored on their quantized codes, then the best
+    top_k * rerank_factor candidates are re-ranked on full-precision vectors from fetch.
+    """
+
+    def __init__(self, fetch: Optional[FetchFn] = None, rerank_factor: int = 4, block: int = 2048,
+                 dim: Optional[int] = None, capacity: int = 1024):
+        super().__init__(dim=dim, capacity=capacity)
+        self.fetch = fetch
+        self.rerank_factor = rerank_factor
+        self.block = block
+
+    def _approx_scores(self, q: np.ndarray, pos: Optional[np.ndarray]) -> np.ndarray:
+        raise NotImplementedError
+
+    def nbytes(self) -> int:
+        raise NotImplementedError
+
+    def search(self, query: Sequence[float], top_k: int, rowids: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        if self.size == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        if q.shape != (self.dim,):
+            return []
+        q = normalize_rows(q)
+        pos = self.positions(rowids) if rowids is not None else None
+        scores = self._approx_scores(q, pos)
+        idx = top_k_indices(scores, top_k * self.rerank_factor if self.fetch else top_k)
+        candidates = self._rowids[pos[idx] if pos is not None else idx]
+        if not self.fetch:
+            return [(int(rowid), float(scores[i])) for rowid, i in zip(candidates, idx)]
+        exact = normalize_rows(self.fetch(candidates)) @ q
+        order = top_k_indices(exact, top_k)
+        return [(int(candidates[i]), float(exact[i])) for i in order]
+
+class Int8Index(QuantizedIndex):
+    """
+    Scalar int8 quantization with one float32 scale per vector (about 4x smaller than float32).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self._rowids):
+            return
+        capacity = max(self._capacity, len(self._rowids) * 2, needed)
+        self._codes = _grow(self._codes, capacity, (self.dim,), np.int8, self.size)
+        self._scales = _grow(self._scales, capacity, (), np.float32, self.size)
+        self._rowids = _grow(self._rowids, capacity, (), np.int64, self.size)
+
+    def _store(self, block: np.ndarray) -> None:
+        scales = np.abs(block).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self._codes[self.size:self.size + len(block)] = np.round(block / scales[:, None]).astype(np.int8)
+        self._scales[self.size:self.size + len(block)] = scales
+
+    def _approx_scores(self, q: np.ndarray, pos: Optional[np.ndarray]) -> np.ndarray:
+        if pos is not None:
+            return (self._codes[pos].astype(np.float32) @ q) * self._scales[pos]
+        scores = np.empty(self.size, dtype=np.float32)
+        # Dequantize block by block so peak memory stays bounded
+        for start in range(0, self.size, self.block):
+            end = min(start + self.block, self.size)
+            scores[start:end] = (self._codes[start:end].astype(np.float32) @ q) * self._scales[start:end]
+        return scores
+
+    def nbytes(self) -> int:
+        return self.size * (self.dim + 4)
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            codes=self._codes[:self.size] if self.size else np.empty((0, self.dim or 0), dtype=np.int8),
+            scales=self._scales[:self.size] if self.size else np.empty(0, dtype=np.float32),
+            rowids=self._rowids[:self.size],
+            meta=np.array([self.last_rowid], dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "Int8Index":
+        data = np.load(path)
+        codes = data["codes"]
+        index = cls(dim=codes.shape[1] or None, capacity=max(len(codes), 1024), **kwargs)
+        if len(codes):
+            index._reserve(len(codes))
+            index._codes[:len(codes)] = codes
+            index._scales[:len(codes)] = data["scales"]
+            index._rowids[:len(codes)] = data["rowids"]
+            index.size = len(codes)
+        index.last_rowid = int(data["meta"][0])
+        return index
+
+class PQIndex(QuantizedIndex):
+    """
+    Product quantization: each vector is split into m sub-vectors, each stored as the uint8
+    id of its nearest of 256 sub-centroids. Queries use asymmetric distance computation
+    with a precomputed (m, 256) lookup table. Rows are kept in float32 until train_size
+    rows exist to fit the codebooks.
+    """
+
+    def __init__(self, m: Optional[int] = None, train_size: int = 10000, ks: int = 256, **kwargs):
+        super().__init__(**kwargs)
+        self.m = m
+        self.ks = ks
+        self.train_size = train_size
+        self.codebooks: Optional[np.ndarray] = None
+        self._raw: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self._rowids):
+            return
+        capacity = max(self._capacity, len(self._rowids) * 2, needed)
+        if self.trained:
+            self._codes = _grow(self._codes, capacity, (self.m,), np.uint8, self.size)
+        else:
+            self._raw = _grow(self._raw, capacity, (self.dim,), np.float32, self.size)
+        self._rowids = _grow(self._rowids, capacity, (), np.int64, self.size)
+
+    def _encode(self, block: np.ndarray) -> np.ndarray:
+        dsub = self.dim // self.m
+        codes = np.empty((len(block), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = block[:, j * dsub:(j + 1) * dsub]
+            c = self.codebooks[j]
+            codes[:, j] = np.argmax(sub @ c.T - 0.5 * (c * c).sum(axis=1), axis=1)
+        return codes
+
+    def _store(self, block: np.ndarray) -> None:
+        if self.trained:
+            self._codes[self.size:self.size + len(block)] = self._encode(block)
+        else:
+            self._raw[self.size:self.size + len(block)] = block
+
+    def add(self, rowids: Sequence[int], embeddings) -> int:
+        added = super().add(rowids, embeddings)
+        if added and not self.trained and self.size >= self.train_size:
+            self.train()
+        return added
+
+    def train(self, iterations: int = 8, max_samples: int = 10000, seed: int = 0) -> None:
+        """
+        Fit one k-means codebook per subspace and encode every stored row.
+        """
+        if self.m is None:
+            self.m = max(k for k in range(1, self.dim // 8 + 1) if self.dim % k == 0)
+        dsub = self.dim // self.m
+        rng = np.random.default_rng(seed)
+        raw = self._raw[:self.size]
+        sample = raw[rng.choice(self.size, min(self.size, max_samples), replace=False)]
+        self.codebooks = np.stack([
+            kmeans(sample[:, j * dsub:(j + 1) * dsub], self.ks, iterations, seed + j) for j in range(self.m)
+        ])
+        capacity = len(self._rowids)
+        self._codes = np.empty((capacity, self.m), dtype=np.uint8)
+        for start in range(0, self.size, self.block):
+            end = min(start + self.block, self.size)
+            self._codes[start:end] = self._encode(raw[start:end])
+        self._raw = None
+
+    def _approx_scores(self, q: np.ndarray, pos: Optional[np.ndarray]) -> np.ndarray:
+        if not self.trained:
+            return self._raw[pos] @ q if pos is not None else self._raw[:self.size] @ q
+        # Lookup table of sub-query . sub-centroid inner products
+        lut = np.einsum("mkd,md->mk", self.codebooks, q.reshape(self.m, -1))
+        cols = np.arange(self.m)
+        if pos is not None:
+            return lut[cols, self._codes[pos]].sum(axis=1)
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, self.block):
+            end = min(start + self.block, self.size)
+            scores[start:end] = lut[cols, self._codes[start:end]].sum(axis=1)
+        return scores
+
+    def nbytes(self) -> int:
+        if not self.trained:
+            return self.size * self.dim * 4
+        return self.size * self.m + self.codebooks.nbytes
+
+    def save(self, path: str) -> None:
+        # Codebooks and codes once trained, otherwise the float32 rows still awaiting training
+        dim = self.dim or 0
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            codebooks=self.codebooks if self.trained else np.empty((0, self.ks, 0), dtype=np.float32),
+            codes=self._codes[:self.size] if self.trained else np.empty((0, self.m or 0), dtype=np.uint8),
+            raw=np.empty((0, dim), dtype=np.float32) if self.trained or not self.size else self._raw[:self.size],
+            rowids=self._rowids[:self.size],
+            meta=np.array([self.last_rowid, self.m or 0, self.train_size, dim], dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "PQIndex":
+        data = np.load(path)
+        last_rowid, m, train_size, dim = (int(x) for x in data["meta"])
+        kwargs.setdefault("train_size", train_size)
+        rowids = data["rowids"]
+        index = cls(m=m or None, dim=dim or None, capacity=max(len(rowids), 1024), **kwargs)
+        if len(data["codebooks"]):
+            index.codebooks = data["codebooks"].astype(np.float32, copy=False)
+        if len(rowids):
+            index._reserve(len(rowids))
+            if index.trained:
+                index._codes[:len(rowids)] = data["codes"]
+            else:
+                index._raw[:len(rowids)] = data["raw"]
+            index._rowids[:len(rowids)] = rowids
+            index.size = len(rowids)
+        index.last_rowid = last_rowid
+        return index
+
+def benchmark(n: int = 10000, dim: int = 1536, queries: int = 50, k: int = 10, seed: int = 0) -> None:
+    """
+    Compare memory, recall@k and query latency of the exact, int8 and PQ indexes on
+    synthetic clustered data.
+    """
+    import time
+    rng = np.random.default_rng(seed)
+    # Low-rank clustered data, roughly like real text embeddings
+    latent = rng.normal(size=(max(n // 100, 1), 64))[rng.integers(0, max(n // 100, 1), n)] + 0.5 * rng.normal(size=(n, 64))
+    data = (latent @ rng.normal(size=(64, dim)) + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+    rowids = np.arange(1, n + 1)
+    full = normalize_rows(data)
+    fetch = lambda ids: full[ids - 1]
+    exact = EmbeddingIndex()
+    exact.add(rowids, data)
+    qs = data[rng.choice(n, queries, replace=False)] + 0.1 * rng.normal(size=(queries, dim)).astype(np.float32)
+    truth = [{r for r, _ in exact.search(q, k)} for q in qs]
+    print(f"{'index':<16}{'MB':>10}{'x smaller':>11}{'recall@' + str(k):>11}{'ms/query':>10}")
+    print(f"{'float32 exact':<16}{n * dim * 4 / 1e6:>10.1f}{1.0:>11.1f}{1.0:>11.3f}{'':>10}")
+    for name, index in [
+        ("int8", Int8Index()),
+        ("int8+rerank", Int8Index(fetch=fetch)),
+        ("pq", PQIndex(train_size=n)),
+        ("pq+rerank", PQIndex(train_size=n, fetch=fetch, rerank_factor=10)),
+    ]:
+        index.add(rowids, data)
+        start = time.perf_counter()
+        results = [{r for r, _ in index.search(q, k)} for q in qs]
+        ms = (time.perf_counter() - start) * 1000 / queries
+        recall = np.mean([len(t & r) / k for t, r in zip(truth, results)])
+        mb = index.nbytes() / 1e6
+        print(f"{name:<16}{mb:>10.1f}{n * dim * 4 / 1e6 / mb:>11.1f}{recall:>11.3f}{ms:>10.2f}")
+
+if __name__ == "__main__":
+    benchmark()
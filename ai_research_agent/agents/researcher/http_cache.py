@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import requests
+from agents.scheduler import PRIORITY_INTERACTIVE, RequestScheduler
+
+# Seconds a response stays fresh, per host; other hosts use default_ttl
+DEFAULT_TTLS = {
+    "api.openalex.org": 3600,
+    "api.perplexity.ai": 600,
+}
+
+def normalize_request(method: str, url: str, params: Optional[Dict[str, Any]] = None, body: Any = None) -> str:
+    """
+    Canonical form of a request: upper-case method, lower-case scheme and host, query
+    parameters (from the URL and params) sorted, and a JSON body with sorted keys.
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(str(k), str(v)) for k, v in params.items()]
+    normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(sorted(query)), ""))
+    normalized_body = json.dumps(body, sort_keys=True, separators=(",", ":")) if body is not None else ""
+    return f"{method.upper()} {normalized_url}\n{normalized_body}"
+
+class CachedResponse:
+    """
+    Minimal stand-in for requests.Response returned by HTTPCache.request.
+    """
+
+    def __init__(self, status_code: int, reason: str, headers: Dict[str, str], content: bytes, url: str,
+                 from_cache: bool = False):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} {self.reason} for url: {self.url}")
+
+class HTTPCache:
+    """
+    Persistent HTTP response cache: an in-process LRU in front of an SQLite table keyed by
+    a hash of the normalized request. Fresh entries are served without a network call;
+    stale entries with an ETag or Last-Modified are revalidated with a conditional request.
+    Only 200 responses are stored, and the table is trimmed to max_bytes by least-recent use.
+    """
+
+    def __init__(self, path: str = "ai_research_agent/http_cache.db", ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 600, max_bytes: int = 64 * 1024 * 1024, max_memory_items: int = 256):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.max_memory_items = max_memory_items
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, Tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                status INTEGER,
+                reason TEXT,
+                headers TEXT,
+                body BLOB,
+                expires_at REAL,
+                last_used REAL,
+                size INTEGER
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_http_cache_last_used ON http_cache (last_used)")
+        self.conn.commit()
+        self.nbytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[Dict[str, Any]] = None, body: Any = None) -> str:
+        return hashlib.sha256(normalize_request(method, url, params, body).encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        return self.ttls.get(urlsplit(url).hostname or "", self.default_ttl)
+
+    def _get(self, key: str) -> Optional[Tuple]:
+        # (url, status, reason, headers, body, expires_at)
+        entry = self._lru.get(key)
+        if entry is not None:
+            self._lru.move_to_end(key)
+            return entry
+        row = self.conn.execute(
+            "SELECT url, status, reason, headers, body, expires_at FROM http_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        entry = (row[0], row[1], row[2], json.loads(row[3]), bytes(row[4]), row[5])
+        self._remember(key, entry)
+        with self.conn:
+            self.conn.execute("UPDATE http_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        return entry
+
+    def _remember(self, key: str, entry: Tuple) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def _put(self, key: str, entry: Tuple) -> None:
+        url, status, reason, headers, body, expires_at = entry
+        size = len(body) + len(url)
+        if size > self.max_bytes:
+            return
+        self._remember(key, entry)
+        with self.conn:
+            old = self.conn.execute("SELECT size FROM http_cache WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_cache (key, url, status, reason, headers, body, expires_at, last_used, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, reason, json.dumps(headers), body, expires_at, time.time(), size)
+            )
+            self.nbytes += size - (old[0] if old else 0)
+            while self.nbytes > self.max_bytes:
+                victims = self.conn.execute(
+                    "SELECT key, size FROM http_cache WHERE key != ? ORDER BY last_used LIMIT 64", (key,)
+                ).fetchall()
+                if not victims:
+                    break
+                for victim, victim_size in victims:
+                    self.conn.execute("DELETE FROM http_cache WHERE key = ?", (victim,))
+                    self._lru.pop(victim, None)
+                    self.nbytes -= victim_size
+                    self.evictions += 1
+                    if self.nbytes <= self.max_bytes:
+                        break
+
+    def request(self, session: requests.Session, method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                json_body: Any = None, headers: Optional[Dict[str, str]] = None, timeout: float = 10,
+                bypass: bool = False, ttl: Optional[float] = None, scheduler: Optional[RequestScheduler] = None,
+                priority: int = PRIORITY_INTERACTIVE) -> CachedResponse:
+        """
+        Perform a request through the cache. bypass=True always goes to the network (the
+        fresh response is still stored); ttl overrides the per-host TTL. Network calls go
+        through scheduler when one is given, so cache hits never spend rate-limit tokens.
+        """
+        key = self.key(method, url, params, json_body)
+        now = time.time()
+        entry = None
+        if bypass:
+            self.bypassed += 1
+        else:
+            with self._lock:
+                entry = self._get(key)
+            if entry is not None and entry[5] > now:
+                self.hits += 1
+                return CachedResponse(entry[1], entry[2], entry[3], entry[4], entry[0], from_cache=True)
+        headers = dict(headers or {})
+        if entry is not None:
+            # Stale: ask the server whether our copy is still valid
+            if entry[3].get("ETag"):
+                headers["If-None-Match"] = entry[3]["ETag"]
+            if entry[3].get("Last-Modified"):
+                headers["If-Modified-Since"] = entry[3]["Last-Modified"]
+        if scheduler is not None:
+            response = scheduler.request(session, method, url, priority=priority, params=params, json=json_body,
+                                         headers=headers, timeout=timeout)
+        else:
+            response = session.request(method, url, params=params, json=json_body, headers=headers, timeout=timeout)
+        expires_at = now + (ttl if ttl is not None else self.ttl_for(url))
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            entry = entry[:5] + (expires_at,)
+            with self._lock:
+                self._put(key, entry)
+            return CachedResponse(entry[1], entry[2], entry[3], entry[4], entry[0], from_cache=True)
+        if not bypass:
+            self.misses += 1
+        kept = {name: response.headers[name] for name in ("Content-Type", "ETag", "Last-Modified") if name in response.headers}
+        result = CachedResponse(response.status_code, response.reason, kept, response.content, response.url)
+        if response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", ""):
+            with self._lock:
+                self._put(key, (response.url, response.status_code, response.reason, kept, response.content, expires_at))
+        return result
+
+    def clear(self) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM http_cache")
+            self._lru.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": (self.hits + self.revalidated) / lookups if lookups else 0.0,
+            "bytes": self.nbytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import glob
+import os
+import re
+import sqlite3
+import time
+
+# Notes searched by default, relative to the working directory (the repo root for the CLI)
+DEFAULT_SOURCES = ("memory-bank", "research_logs_*.log", "ai_research_agent/research_logs_*.log")
+TEXT_EXTENSIONS = (".md", ".txt", ".log", ".rst")
+TOKEN_RE = re.compile(r"\w+")
+HEADING_RE = re.compile(r"^#+\s+(.+)$", re.MULTILINE)
+
+def _read(path: str, max_bytes: int) -> Tuple[str, str]:
+    # (title, body) for one file; the title is its first markdown heading or its file name
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        body = f.read(max_bytes)
+    heading = HEADING_RE.search(body)
+    return (heading.group(1).strip() if heading else os.path.basename(path)), body
+
+class LocalIndex:
+    """
+    Persistent full-text index over local notes: an SQLite FTS5 table ranked with BM25
+    plus a table of each file's mtime and size. refresh() stats the source trees and
+    re-reads (in parallel) only files that are new or whose mtime or size changed.
+    """
+
+    def __init__(self, db_path: str = "ai_research_agent/local_index.db", sources: Sequence[str] = DEFAULT_SOURCES,
+                 extensions: Sequence[str] = TEXT_EXTENSIONS, max_workers: int = 8, refresh_interval: float = 30.0,
+                 max_file_bytes: int = 2 * 1024 * 1024):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Not thread-bound: built lazily on whichever thread runs the researcher's first search
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.sources = list(sources)
+        self.extensions = tuple(extensions)
+        self.max_workers = max_workers
+        self.refresh_interval = refresh_interval
+        self.max_file_bytes = max_file_bytes
+        self.last_refresh = 0.0
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS local_files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                mtime REAL,
+                size INTEGER
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS local_fts USING fts5(title, body, tokenize='porter unicode61');
+        """)
+        self.conn.commit()
+
+    def _walk(self) -> Iterator[str]:
+        # Directories are searched recursively for text files; other sources are glob patterns
+        for source in self.sources:
+            if os.path.isdir(source):
+                for root, _, files in os.walk(source):
+                    for name in files:
+                        if name.endswith(self.extensions):
+                            yield os.path.join(root, name)
+            else:
+                for path in glob.glob(source, recursive=True):
+                    if os.path.isfile(path):
+                        yield path
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        Bring the index up to date with the source trees. Returns counts of added,
+        updated and removed files.
+        """
+        now = time.monotonic()
+        if not force and now - self.last_refresh < self.refresh_interval:
+            return {"added": 0, "updated": 0, "removed": 0}
+        self.last_refresh = now
+        known = {path: (file_id, mtime, size) for file_id, path, mtime, size in
+                 self.conn.execute("SELECT id, path, mtime, size FROM local_files")}
+        seen = set()
+        changed: List[Tuple[str, float, int]] = []
+        for path in self._walk():
+            path = os.path.normpath(path)
+            if path in seen:
+                continue
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entry = known.get(path)
+            if entry is None or entry[1] != st.st_mtime or entry[2] != st.st_size:
+                changed.append((path, st.st_mtime, st.st_size))
+        removed = [entry[0] for path, entry in known.items() if path not in seen]
+        added = updated = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(changed), 500):
+                batch = changed[start:start + 500]
+                docs = list(executor.map(lambda item: self._safe_read(item[0]), batch))
+                with self.conn:
+                    for (path, mtime, size), doc in zip(batch, docs):
+                        if doc is None:
+                            continue
+                        entry = known.get(path)
+                        if entry is None:
+                            cur = self.conn.execute(
+                                "INSERT INTO local_files (path, mtime, size) VALUES (?, ?, ?)", (path, mtime, size)
+                            )
+                            file_id = cur.lastrowid
+                            added += 1
+                        else:
+                            file_id = entry[0]
+                            self.conn.execute("UPDATE local_files SET mtime = ?, size = ? WHERE id = ?", (mtime, size, file_id))
+                            self.conn.execute("DELETE FROM local_fts WHERE rowid = ?", (file_id,))
+                            updated += 1
+                        self.conn.execute("INSERT INTO local_fts (rowid, title, body) VALUES (?, ?, ?)", (file_id, doc[0], doc[1]))
+        if removed:
+            with self.conn:
+                self.conn.executemany("DELETE FROM local_files WHERE id = ?", [(file_id,) for file_id in removed])
+                self.conn.executemany("DELETE FROM local_fts WHERE rowid = ?", [(file_id,) for file_id in removed])
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def _safe_read(self, path: str) -> Optional[Tuple[str, str]]:
+        try:
+            return _read(path, self.max_file_bytes)
+        except OSError:
+            return None
+
+    def search(self, query: str, top_k: int = 5, highlight: Tuple[str, str] = ("**", "**")) -> List[Dict[str, Any]]:
+        """
+        BM25-ranked search (title matches weighted up) returning {title, path, snippet}
+        dicts, with matched terms in the snippet wrapped in the highlight markers.
+        """
+        self.refresh()
+        terms = TOKEN_RE.findall(query)
+        if not terms:
+            return []
+        # Quote every term so user input is never parsed as FTS5 query syntax
+        match = " OR ".join('"' + term + '"' for term in terms)
+        cur = self.conn.execute("""
+            SELECT local_fts.title, f.path, snippet(local_fts, 1, ?, ?, '...', 24)
+            FROM local_fts JOIN local_files f ON f.id = local_fts.rowid
+            WHERE local_fts MATCH ?
+            ORDER BY bm25(local_fts, 5.0, 1.0)
+            LIMIT ?
+        """, (highlight[0], highlight[1], match, top_k))
+        return [{"title": title, "path": path, "snippet": snippet} for title, path, snippet in cur.fetchall()]
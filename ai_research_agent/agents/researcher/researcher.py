@@ -1,15 +1,71 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from agents.types import Agent, AgentRole, Task, Message
 import json
+import os
 import requests
+from requests.adapters import HTTPAdapter
+from agents.researcher.http_cache import HTTPCache
+from agents.researcher.local_index import DEFAULT_SOURCES, LocalIndex
+from agents.researcher.summarizer import ExtractiveSummarizer, truncate_tokens
+from agents.scheduler import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RequestScheduler, default_scheduler
+
+OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+# Only the work fields normalize_work reads
+OPENALEX_SELECT = "id,display_name,abstract_inverted_index"
+
+def reconstruct_abstract(inverted_index: Optional[Dict[str, List[int]]]) -> str:
+    """
+    Rebuild abstract text from an OpenAlex abstract_inverted_index (word -> positions).
+    """
+    if not inverted_index:
+        return "(No abstract available)"
+    length = 1 + max((pos for positions in inverted_index.values() for pos in positions), default=-1)
+    words = [""] * length
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            words[pos] = word
+    return " ".join(word for word in words if word)
+
+def normalize_work(work: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": work.get("display_name", ""),
+        "url": work.get("id", ""),
+        "snippet": reconstruct_abstract(work.get("abstract_inverted_index")),
+    }
 
 class ResearcherAgent(Agent):
     role = AgentRole.RESEARCHER
 
-    def __init__(self):
+    def __init__(self, pool_size: int = 16, max_workers: int = 8, cache: Optional[HTTPCache] = None,
+                 use_cache: bool = True, scheduler: Optional[RequestScheduler] = None,
+                 local_sources: Sequence[str] = DEFAULT_SOURCES, digest_tokens: int = 400):
         self.log: List[Dict[str, Any]] = []
+        self.max_workers = max_workers
+        # Shared with every other agent calling the same APIs unless one is passed in
+        self.scheduler = scheduler or default_scheduler()
+        self.local_sources = list(local_sources)
+        # Built on first local_search so agents that never search notes do not walk the tree
+        self.local_index: Optional[LocalIndex] = None
+        self.summarizer = ExtractiveSummarizer(max_tokens=digest_tokens)
+        self.cache = cache if cache is not None else (HTTPCache() if use_cache else None)
+        # One keep-alive session shared by all searches (and threads) so connections are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
 
-    def web_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _request(self, method: str, url: str, timeout: float, bypass_cache: bool = False,
+                 headers: Optional[Dict[str, str]] = None, json_body: Any = None, priority: int = PRIORITY_INTERACTIVE):
+        # Route through the response cache when one is configured; network calls are rate limited
+        if self.cache is None:
+            return self.scheduler.request(self.session, method, url, priority=priority, headers=headers,
+                                          json=json_body, timeout=timeout)
+        return self.cache.request(self.session, method, url, json_body=json_body, headers=headers,
+                                  timeout=timeout, bypass=bypass_cache, scheduler=self.scheduler, priority=priority)
+
+    def web_search(self, query: str, top_k: int = 5, timeout: float = 10, bypass_cache: bool = False,
+                   priority: int = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
         """
         Perform a real research paper search using the OpenAlex API and return a list of result dicts.
         If no results are found in the abstract, retry with a title search.
@@ -17,53 +73,18 @@ class ResearcherAgent(Agent):
         self.log.append({"event": "web_search", "query": query, "top_k": top_k})
         try:
             # First, search abstracts
-            url = f"https://api.openalex.org/works?filter=abstract.search:{requests.utils.quote(query)}&per-page={top_k}"
-            response = requests.get(url, timeout=10)
+            url = f"{OPENALEX_WORKS_URL}?filter=abstract.search:{requests.utils.quote(query)}&per-page={top_k}"
+            response = self._request("GET", url, timeout, bypass_cache, priority=priority)
             response.raise_for_status()
-            data = response.json()
-            normalized = []
-            for work in data.get("results", []):
-                # Reconstruct abstract from abstract_inverted_index if present
-                abstract = ""
-                idx = work.get("abstract_inverted_index")
-                if idx:
-                    pos_to_word = {}
-                    for word, positions in idx.items():
-                        for pos in positions:
-                            pos_to_word[pos] = word
-                    abstract = " ".join([pos_to_word[i] for i in range(len(pos_to_word))])
-                else:
-                    abstract = "(No abstract available)"
-                normalized.append({
-                    "title": work.get("display_name", ""),
-                    "url": work.get("id", ""),
-                    "snippet": abstract,
-                })
+            normalized = [normalize_work(work) for work in response.json().get("results", [])]
             if normalized:
                 self.log.append({"event": "web_search_results", "count": len(normalized)})
                 return normalized
             # If no results, retry with title search
-            url_title = f"https://api.openalex.org/works?filter=title.search:{requests.utils.quote(query)}&per-page={top_k}"
-            response_title = requests.get(url_title, timeout=10)
+            url_title = f"{OPENALEX_WORKS_URL}?filter=title.search:{requests.utils.quote(query)}&per-page={top_k}"
+            response_title = self._request("GET", url_title, timeout, bypass_cache, priority=priority)
             response_title.raise_for_status()
-            data_title = response_title.json()
-            normalized_title = []
-            for work in data_title.get("results", []):
-                abstract = ""
-                idx = work.get("abstract_inverted_index")
-                if idx:
-                    pos_to_word = {}
-                    for word, positions in idx.items():
-                        for pos in positions:
-                            pos_to_word[pos] = word
-                    abstract = " ".join([pos_to_word[i] for i in range(len(pos_to_word))])
-                else:
-                    abstract = "(No abstract available)"
-                normalized_title.append({
-                    "title": work.get("display_name", ""),
-                    "url": work.get("id", ""),
-                    "snippet": abstract,
-                })
+            normalized_title = [normalize_work(work) for work in response_title.json().get("results", [])]
             if normalized_title:
                 self.log.append({"event": "web_search_results_title_fallback", "count": len(normalized_title)})
                 return normalized_title
@@ -74,20 +95,120 @@ class ResearcherAgent(Agent):
             # Fallback to stub results
             return [{"title": f"Result {i+1}", "url": f"https://example.com/{i+1}", "snippet": "Stub result"} for i in range(top_k)]
 
+    def web_search_many(self, queries: Sequence[str], top_k: int = 5, max_workers: Optional[int] = None,
+                        timeout: float = 10, bypass_cache: bool = False,
+                        priority: int = PRIORITY_INTERACTIVE) -> List[List[Dict[str, Any]]]:
+        """
+        Run web_search for several queries concurrently over the shared connection pool,
+        at most max_workers at a time. Results are returned in query order.
+        """
+        queries = list(queries)
+        self.log.append({"event": "web_search_many", "query_count": len(queries), "top_k": top_k})
+        if not queries:
+            return []
+        workers = min(max_workers or self.max_workers, len(queries))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda query: self.web_search(query, top_k=top_k, timeout=timeout, bypass_cache=bypass_cache,
+                                              priority=priority),
+                queries
+            ))
+
+    def iter_works(self, query: str, field: str = "abstract", cursor: str = "*", per_page: int = 200,
+                   max_results: Optional[int] = None, select: str = OPENALEX_SELECT,
+                   timeout: float = 30, priority: int = PRIORITY_BACKGROUND) -> Iterator[Dict[str, Any]]:
+        """
+        Stream every OpenAlex work matching query (searched in the given field) by walking
+        cursor pagination, one page in memory at a time. Each normalized record carries
+        the "cursor" of its page; passing it back as cursor resumes from that page.
+        Harvest pages go straight to the network rather than through the response cache.
+        """
+        self.log.append({"event": "iter_works", "query": query, "cursor": cursor})
+        yielded = 0
+        while cursor:
+            params = {
+                "filter": f"{field}.search:{query}",
+                "per-page": per_page,
+                "cursor": cursor,
+                "select": select,
+            }
+            response = self.scheduler.request(self.session, "GET", OPENALEX_WORKS_URL, priority=priority,
+                                              params=params, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            results = data.get("results", [])
+            for work in results:
+                record = normalize_work(work)
+                record["cursor"] = cursor
+                yield record
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+            next_cursor = data.get("meta", {}).get("next_cursor")
+            self.log.append({"event": "iter_works_page", "count": len(results), "next_cursor": next_cursor})
+            if not results:
+                return
+            cursor = next_cursor
+
+    def news_search(self, query: str, system_prompt: Optional[str] = None, timeout: float = 20,
+                    bypass_cache: bool = False, priority: int = PRIORITY_INTERACTIVE) -> str:
+        """
+        Ask Perplexity for a news digest on the query and return the answer text (or an
+        error message in parentheses).
+        """
+        self.log.append({"event": "news_search", "query": query})
+        api_key = os.getenv("PERPLEXITY_API_KEY")
+        if not api_key:
+            return "(Perplexity API key not found. Please set PERPLEXITY_API_KEY in your .env file.)"
+        try:
+            url = "https://api.perplexity.ai/chat/completions"
+            headers = {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            }
+            model = os.getenv("PERPLEXITY_MODEL", "sonar-pro")
+            messages = []
+            if system_prompt:
+                messages.append({"role": "system", "content": system_prompt})
+            messages.append({"role": "user", "content": query})
+            payload = {
+                "model": model,
+                "messages": messages
+            }
+            response = self._request("POST", url, timeout, bypass_cache, headers=headers, json_body=payload,
+                                     priority=priority)
+            if response.status_code != 200:
+                return f"(Perplexity news search error: {response.status_code} {response.reason}\n{response.text})"
+            data = response.json()
+            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+            return answer if answer else "(No Perplexity results found.)"
+        except Exception as e:
+            self.log.append({"event": "news_search_error", "error": str(e)})
+            return f"(Perplexity news search error: {e})"
+
     def local_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
-        Search local files/notes and return a list of result dicts.
+        Search local notes (memory-bank, research logs and any configured local_sources)
+        through the persistent BM25 index and return a list of result dicts.
         """
         self.log.append({"event": "local_search", "query": query, "top_k": top_k})
-        return [{"title": f"Local Result {i+1}", "path": f"/path/to/file_{i+1}.md", "snippet": "Stub local result"} for i in range(top_k)]
+        if self.local_index is None:
+            self.local_index = LocalIndex(sources=self.local_sources)
+        results = self.local_index.search(query, top_k=top_k)
+        self.log.append({"event": "local_search_results", "count": len(results)})
+        return results
 
-    def synthesize_digest(self, sources: List[Dict[str, Any]]) -> str:
+    def synthesize_digest(self, sources: List[Dict[str, Any]], max_tokens: Optional[int] = None) -> str:
         """
-        Synthesize a digest from multiple sources.
+        Synthesize a bounded digest from multiple sources: an extractive summary of at most
+        max_tokens (default digest_tokens), with each sentence kept under its source title.
         """
         self.log.append({"event": "synthesize_digest", "source_count": len(sources)})
-        # Simple concatenation for now; can be replaced with LLM summarization
-        digest = "\n\n".join([f"{src.get('title', 'Untitled')}: {src.get('snippet', '')}" for src in sources])
+        budget = self.summarizer.max_tokens if max_tokens is None else max_tokens
+        digest = self.summarizer.summarize(sources, budget)
+        if not digest:
+            # Nothing to extract from (e.g. no abstracts): list the source titles, still within budget
+            digest = truncate_tokens("\n".join(src.get("title", "Untitled") for src in sources), budget)
         return digest
 
     def receive_task(self, task: Task) -> None:
@@ -106,4 +227,6 @@ class ResearcherAgent(Agent):
         return {
             "role": self.role,
             "log_length": len(self.log),
+            "http_cache": self.cache.stats() if self.cache is not None else None,
+            "scheduler": self.scheduler.stats(),
         }
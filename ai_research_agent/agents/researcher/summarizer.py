@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import re
+import numpy as np
+from agents.memory.embedders import HashingEmbedder, TOKEN_RE
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+PLACEHOLDERS = {"(No abstract available)", "Stub result"}
+
+def split_sentences(text: str, min_words: int = 4, max_words: int = 60) -> List[str]:
+    # Run-on text without sentence punctuation is cut into max_words pieces
+    sentences = []
+    for sentence in SENTENCE_RE.split(" ".join(text.split())):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            piece = words[start:start + max_words]
+            if len(piece) >= min_words:
+                sentences.append(" ".join(piece))
+    return sentences
+
+def count_tokens(text: str) -> int:
+    # Rough token estimate: word pieces plus punctuation, about 1.3 per word
+    return int(len(TOKEN_RE.findall(text)) * 1.3) + 1
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text at a word boundary so that count_tokens of the result (with the "..."
+    marking the cut) is at most max_tokens.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    end = 0
+    pieces = 0
+    for word in re.finditer(r"\S+", text):
+        pieces += len(TOKEN_RE.findall(word.group()))
+        if int(pieces * 1.3) + 1 > max_tokens:
+            break
+        end = word.end()
+    return text[:end] + "..." if end else ""
+
+def textrank(similarity: np.ndarray, damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    """
+    PageRank over a sentence similarity matrix (negative similarities and the diagonal
+    are ignored). Returns one score per sentence.
+    """
+    n = len(similarity)
+    if n == 0:
+        return np.empty(0, dtype=np.float32)
+    weights = np.clip(similarity, 0, None)
+    np.fill_diagonal(weights, 0)
+    out_degree = weights.sum(axis=1, keepdims=True)
+    # Sentences with no similar neighbours spread their score uniformly
+    transition = np.where(out_degree > 0, weights / np.maximum(out_degree, 1e-12), 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+class ExtractiveSummarizer:
+    """
+    Bounded extractive summary of several sources: sentences are embedded with a local
+    hashing embedder, ranked with TextRank over their cosine-similarity matrix, and
+    picked best first (each source's best sentence first, skipping near-duplicates)
+    until max_tokens is reached. Picked sentences stay attributed to their source and
+    in their original order.
+    """
+
+    def __init__(self, max_tokens: int = 400, redundancy: float = 0.8, dim: int = 1024):
+        self.max_tokens = max_tokens
+        self.redundancy = redundancy
+        self.dim = dim
+
+    def select(self, sources: Sequence[Dict[str, Any]], max_tokens: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return [{"title", "url", "sentences"}] for the sources that contribute sentences.
+        """
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        sentences: List[Tuple[int, int, str]] = []
+        for i, src in enumerate(sources):
+            snippet = src.get("snippet", "") or ""
+            if snippet in PLACEHOLDERS:
+                continue
+            for j, sentence in enumerate(split_sentences(snippet)):
+                sentences.append((i, j, sentence))
+        if not sentences:
+            return []
+        texts = [s[2] for s in sentences]
+        embedder = HashingEmbedder(dim=self.dim).fit(texts)
+        vectors = embedder.embed_batch(texts)
+        similarity = vectors @ vectors.T
+        scores = textrank(similarity)
+        ranked = list(np.argsort(-scores, kind="stable"))
+        # Coverage first: every source's best sentence, then everything else by score
+        best: Dict[int, int] = {}
+        for k in ranked:
+            best.setdefault(sentences[k][0], k)
+        leaders = set(best.values())
+        order = sorted(leaders, key=lambda k: -scores[k]) + [k for k in ranked if k not in leaders]
+        chosen: List[int] = []
+        cited = set()
+        used = 0
+        for k in order:
+            # A source's title is printed once, before its first sentence
+            title = 0 if sentences[k][0] in cited else count_tokens(sources[sentences[k][0]].get("title", "Untitled"))
+            cost = title + count_tokens(texts[k])
+            if used + cost > budget:
+                if chosen:
+                    continue
+                # The top sentence alone exceeds the budget: keep as much of it as fits
+                texts[k] = truncate_tokens(texts[k], budget - title)
+                if not texts[k]:
+                    break
+                sentences[k] = sentences[k][:2] + (texts[k],)
+                cost = title + count_tokens(texts[k])
+            if chosen and similarity[k, chosen].max() > self.redundancy:
+                continue
+            chosen.append(k)
+            cited.add(sentences[k][0])
+            used += cost
+        picked: Dict[int, List[Tuple[int, str]]] = {}
+        for k in chosen:
+            i, j, sentence = sentences[k]
+            picked.setdefault(i, []).append((j, sentence))
+        return [
+            {
+                "title": sources[i].get("title", "Untitled"),
+                "url": sources[i].get("url", ""),
+                "sentences": [sentence for _, sentence in sorted(picked[i])],
+            }
+            for i in sorted(picked)
+        ]
+
+    def summarize(self, sources: Sequence[Dict[str, Any]], max_tokens: Optional[int] = None) -> str:
+        return "\n\n".join(
+            f"{entry['title']}: {' '.join(entry['sentences'])}" for entry in self.select(sources, max_tokens)
+        )
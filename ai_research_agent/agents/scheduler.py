@@ -0,0 +1,205 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import heapq
+import itertools
+import random
+import threading
+import time
+
+# Lower values are served first when callers wait on the same host
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# host -> (requests per second, burst)
+DEFAULT_RATES: Dict[str, Tuple[float, int]] = {
+    "api.openalex.org": (10.0, 10),
+    "api.perplexity.ai": (1.0, 3),
+    "api.openai.com": (5.0, 10),
+}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP-date).
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # Set from Retry-After: nobody may call the host before this time
+        self.blocked_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "mean_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+class RequestScheduler:
+    """
+    Process-wide throttle for external APIs. Each host has a token bucket; callers
+    waiting on the same host are admitted in priority order (then arrival order).
+    Calls that come back rate limited or with a transient error are retried with
+    jittered exponential backoff, and a Retry-After pauses the whole host.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None, default_rate: Tuple[float, int] = (5.0, 5),
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: Dict[str, List[Tuple[int, int]]] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._seq = itertools.count()
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(*self.rates.get(host, self.default_rate))
+            self._waiters[host] = []
+            self._stats[host] = HostStats()
+        return bucket
+
+    def acquire(self, host: str, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """
+        Block until the host's bucket admits this caller; returns the seconds waited.
+        """
+        start = time.monotonic()
+        with self._cond:
+            bucket = self._bucket(host)
+            waiters = self._waiters[host]
+            stats = self._stats[host]
+            ticket = (priority, next(self._seq))
+            heapq.heappush(waiters, ticket)
+            stats.queue_depth = len(waiters)
+            stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+            # A new head of the queue may need to take over the timed wait
+            self._cond.notify_all()
+            while True:
+                if waiters[0] == ticket:
+                    delay = bucket.wait_time(time.monotonic())
+                    if delay <= 0:
+                        bucket.tokens -= 1
+                        heapq.heappop(waiters)
+                        stats.queue_depth = len(waiters)
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(timeout=delay)
+                else:
+                    self._cond.wait()
+            waited = time.monotonic() - start
+            stats.requests += 1
+            stats.total_wait += waited
+            stats.max_wait = max(stats.max_wait, waited)
+        return waited
+
+    def _pause(self, host: str, seconds: float) -> None:
+        with self._cond:
+            bucket = self._bucket(host)
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+            self._stats[host].throttled += 1
+
+    @staticmethod
+    def _retry_hint(outcome: Any) -> Tuple[bool, Optional[float], Optional[int]]:
+        # (retryable, Retry-After seconds, status) for a response or an exception
+        response = outcome if hasattr(outcome, "status_code") and not isinstance(outcome, BaseException) \
+            else getattr(outcome, "response", None)
+        status = getattr(response, "status_code", None) or getattr(outcome, "status_code", None)
+        headers = getattr(response, "headers", None) or {}
+        if isinstance(outcome, BaseException):
+            name = type(outcome).__name__
+            if status is None and "RateLimit" in name:
+                status = 429
+            if status is None and name in ("ConnectionError", "Timeout", "ConnectTimeout", "ReadTimeout",
+                                           "APIConnectionError", "APITimeoutError"):
+                return True, None, None
+        if status in RETRY_STATUSES:
+            return True, parse_retry_after(headers.get("Retry-After")), status
+        return False, None, status
+
+    def call(self, host: str, fn: Callable[[], Any], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """
+        Run fn under the host's rate limit, retrying rate-limited and transient failures.
+        After the last retry the final response is returned (or exception raised).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(host, priority)
+            error = None
+            try:
+                outcome = fn()
+            except Exception as e:
+                outcome = error = e
+            retryable, retry_after, status = self._retry_hint(outcome)
+            if not retryable or attempt == self.max_retries:
+                if error is not None:
+                    raise error
+                return outcome
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if status == 429 or retry_after is not None:
+                self._pause(host, delay)
+            with self._cond:
+                self._stats[host].retries += 1
+            time.sleep(delay)
+
+    def request(self, session, method: str, url: str, priority: int = PRIORITY_INTERACTIVE, **kwargs):
+        return self.call(urlsplit(url).hostname or "", lambda: session.request(method, url, **kwargs), priority)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {host: stats.to_dict() for host, stats in self._stats.items()}
+
+_default_scheduler: Optional[RequestScheduler] = None
+_default_lock = threading.Lock()
+
+def default_scheduler() -> RequestScheduler:
+    """
+    The scheduler shared by every agent in the process.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
@@ -1,5 +1,6 @@
 from typing import Any, Dict, List, Optional, Protocol, Union
 from enum import Enum
+import uuid
 
 class AgentRole(str, Enum):
     PLANNER = "planner"
@@ -38,11 +39,19 @@ class Message:
         recipient: AgentRole,
         content: str,
         payload: Optional[Dict[str, Any]] = None,
+        id: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        reply_to: Optional[AgentRole] = None,
     ):
         self.sender = sender
         self.recipient = recipient
         self.content = content
         self.payload = payload or {}
+        self.id = id or uuid.uuid4().hex
+        # Shared by a request and its reply; a request is correlated by its own id
+        self.correlation_id = correlation_id or self.id
+        # Role that should receive the handler's result as a reply message
+        self.reply_to = reply_to
 
 class Agent(Protocol):
     role: AgentRole
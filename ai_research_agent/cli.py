@@ -1,7 +1,9 @@
 from agents.researcher.researcher import ResearcherAgent
 from agents.memory.memory import MemoryAgent
 from agents.memory.knowledge_graph import KnowledgeGraph
+from agents.scheduler import PRIORITY_BACKGROUND
 import json
+import re
 from dotenv import load_dotenv; load_dotenv()
 
 def main():
@@ -12,7 +14,9 @@ def main():
     researcher = ResearcherAgent()
     memory = MemoryAgent()
     watchlist_path = "ai_research_agent/watchlist.json"
+    # Synchronous writes: an idle session or a closed terminal must not lose buffered triples
     kg = KnowledgeGraph()
+    graph_limit = 100
 
     # Load or initialize watchlist
     try:
@@ -206,7 +210,7 @@ def main():
                 source = args.get("source", "news")
                 print(f"[Researcher] Searching for: {topic} (source: {source})")
                 if source == "news":
-                    digest = perplexity_news_search(topic, system_prompt)
+                    digest = researcher.news_search(topic, system_prompt)
                     print("\n=== News Digest ===")
                     print(digest)
                     item_id = memory.embed_and_store(digest, metadata={"source": "news", "topic": topic, "system_prompt": system_prompt})
@@ -376,39 +380,11 @@ def main():
             source = parts[-1] if parts[-1] in ["openalex", "news"] else "openalex"
             print(f"\n[Researcher] Searching for: {topic} (source: {source})")
             if source == "news":
-                def news_with_system(query):
-                    import requests, os
-                    api_key = os.getenv("PERPLEXITY_API_KEY")
-                    if not api_key:
-                        return "(Perplexity API key not found. Please set PERPLEXITY_API_KEY in your .env file.)"
-                    try:
-                        url = "https://api.perplexity.ai/chat/completions"
-                        headers = {
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json"
-                        }
-                        model = os.getenv("PERPLEXITY_MODEL", "sonar-pro")
-                        messages = []
-                        if system_prompt:
-                            messages.append({"role": "system", "content": system_prompt})
-                        messages.append({"role": "user", "content": query})
-                        payload = {
-                            "model": model,
-                            "messages": messages
-                        }
-                        response = requests.post(url, headers=headers, json=payload, timeout=20)
-                        if response.status_code != 200:
-                            return f"(Perplexity news search error: {response.status_code} {response.reason}\n{response.text})"
-                        data = response.json()
-                        answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        return answer if answer else "(No Perplexity results found.)"
-                    except Exception as e:
-                        return f"(Perplexity news search error: {e})"
-                digest = perplexity_news_search(topic, system_prompt)
+                digest = researcher.news_search(topic, system_prompt)
                 print("\n=== News Digest ===")
                 print(digest)
-                item_id = memory.embed_and_store(digest, metadata={"source": "news", "topic": topic, "system_prompt": system_prompt})
                 kg.add_triple(topic, "researched_news", digest, {"source": "news", "system_prompt": system_prompt})
+                metadata = {"source": "news", "topic": topic, "system_prompt": system_prompt}
             else:
                 results = researcher.web_search(topic, top_k=5)
                 digest = researcher.synthesize_digest(results)
@@ -417,9 +393,14 @@ def main():
                     print(digest)
                 else:
                     print("(No results found. Try a more general or academic query, e.g., 'AI code generation', 'transformer models', 'machine learning programming', etc.)")
-                item_id = memory.embed_and_store(digest, metadata={"source": "researcher", "topic": topic, "system_prompt": system_prompt})
                 kg.add_triple(topic, "researched_academic", digest, {"source": "openalex", "system_prompt": system_prompt})
-            print(f"\n[Memory] Digest stored in memory as item_id: {item_id}\n")
+                metadata = {"source": "researcher", "topic": topic, "system_prompt": system_prompt}
+            try:
+                item_id = memory.embed_and_store(digest, metadata=metadata)
+                print(f"\n[Memory] Digest stored in memory as item_id: {item_id}\n")
+            except Exception as e:
+                # Embedding API unavailable: nothing is stored rather than storing incomparable vectors
+                print(f"\n[Memory] Digest not stored (embedding failed: {e})\n")
         elif cmd.lower().startswith("loop "):
             # loop <topic> [n]
             parts = cmd.split()
@@ -428,48 +409,83 @@ def main():
                 continue
             topic = " ".join(parts[1:-1]) if parts[-1].isdigit() else " ".join(parts[1:])
             n = int(parts[-1]) if parts[-1].isdigit() else 3
+            # Repeated cycles return near-identical digests: link them to the first one instead
+            # of storing each (the signature indexes are only loaded once a loop runs)
+            memory.enable_near_duplicates()
+            kg.enable_near_duplicates()
+            digests = []
             for i in range(n):
                 print(f"\n[Loop {i+1}/{n}] Researching: {topic} (source: news)")
-                def news_with_system(query):
-                    import requests, os
-                    api_key = os.getenv("PERPLEXITY_API_KEY")
-                    if not api_key:
-                        return "(Perplexity API key not found. Please set PERPLEXITY_API_KEY in your .env file.)"
-                    try:
-                        url = "https://api.perplexity.ai/chat/completions"
-                        headers = {
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json"
-                        }
-                        model = os.getenv("PERPLEXITY_MODEL", "sonar-pro")
-                        messages = []
-                        if system_prompt:
-                            messages.append({"role": "system", "content": system_prompt})
-                        messages.append({"role": "user", "content": query})
-                        payload = {
-                            "model": model,
-                            "messages": messages
-                        }
-                        response = requests.post(url, headers=headers, json=payload, timeout=20)
-                        if response.status_code != 200:
-                            return f"(Perplexity news search error: {response.status_code} {response.reason}\n{response.text})"
-                        data = response.json()
-                        answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        return answer if answer else "(No Perplexity results found.)"
-                    except Exception as e:
-                        return f"(Perplexity news search error: {e})"
-                digest = perplexity_news_search(topic, system_prompt)
+                # Each cycle wants a fresh answer, not the cached one from the previous cycle
+                digest = researcher.news_search(topic, system_prompt, bypass_cache=i > 0)
                 print("\n=== News Digest ===")
                 print(digest)
-                item_id = memory.embed_and_store(digest, metadata={"source": "news", "topic": topic, "system_prompt": system_prompt, "loop": i+1})
+                digests.append(digest)
                 kg.add_triple(topic, f"loop_{i+1}_researched_news", digest, {"source": "news", "system_prompt": system_prompt, "loop": i+1})
+            # Embed and store all loop digests in one batch
+            try:
+                item_ids = memory.embed_and_store_many(
+                    digests,
+                    [{"source": "news", "topic": topic, "system_prompt": system_prompt, "loop": i+1} for i in range(n)]
+                )
+                # Near-duplicate digests are linked to an earlier item rather than stored again
+                print(f"\n[Memory] Stored {len(item_ids)} digests in memory as {len(set(item_ids))} distinct items.")
+            except Exception as e:
+                print(f"\n[Memory] Digests not stored (embedding failed: {e})")
             print(f"\n[Loop] Completed {n} research cycles for topic: {topic}\n")
+        elif cmd.lower().startswith("harvest "):
+            # harvest <topic> [n] [cursor]: stream up to n OpenAlex works into memory, one page at
+            # a time, starting from a cursor printed by a failed harvest
+            parts = cmd.split()
+            cursor = "*"
+            # OpenAlex cursors are "*" or base64 tokens with digits; other words stay in the topic
+            if len(parts) > 3 and parts[-2].isdigit() and re.fullmatch(r"\*|[A-Za-z0-9+/]{16,}={0,2}", parts[-1]) \
+                    and not parts[-1].isalpha():
+                cursor = parts.pop()
+            has_n = len(parts) > 2 and parts[-1].isdigit()
+            topic = " ".join(parts[1:-1]) if has_n else " ".join(parts[1:])
+            n = int(parts[-1]) if has_n else 1000
+            if not topic:
+                print("Please provide a topic to harvest.")
+                continue
+            batch = []
+            stored = 0
+            # Page cursor to resume from if the harvest fails (may repeat up to one page)
+            resume = cursor
+            try:
+                for work in researcher.iter_works(topic, cursor=cursor, max_results=n):
+                    if not batch:
+                        resume = work["cursor"]
+                    batch.append(work)
+                    if len(batch) == 200:
+                        stored += len(memory.embed_and_store_many(
+                            [f"{w['title']}: {w['snippet']}" for w in batch],
+                            [{"source": "openalex", "topic": topic, "url": w["url"]} for w in batch]
+                        ))
+                        batch = []
+                        print(f"[Harvest] Stored {stored} works...")
+                if batch:
+                    stored += len(memory.embed_and_store_many(
+                        [f"{w['title']}: {w['snippet']}" for w in batch],
+                        [{"source": "openalex", "topic": topic, "url": w["url"]} for w in batch]
+                    ))
+                print(f"[Harvest] Stored {stored} works on '{topic}' in memory.")
+            except Exception as e:
+                print(f"Harvest error after {stored} works: {e}")
+                print(f"Resume with: harvest {topic} {n - stored} {resume}")
         elif cmd.lower().startswith("recall "):
+            # Allow: recall <query> [hybrid]
             query = cmd[len("recall "):].strip()
+            hybrid = query.split()[-1:] == ["hybrid"]
+            if hybrid:
+                query = query[:-len("hybrid")].strip()
             if not query:
                 print("Please provide a query to recall.")
                 continue
-            recall_results = memory.semantic_search(query, top_k=1)
+            if hybrid:
+                recall_results = memory.hybrid_search(query, top_k=1)
+            else:
+                recall_results = memory.semantic_search(query, top_k=1)
             print("\n=== Quick Recall Result ===")
             if recall_results:
                 print(recall_results[0].content)
@@ -492,25 +508,53 @@ def main():
             for t in watchlist:
                 print(f"- {t}")
             print("\nChecking for new research on watchlist topics...")
-            for t in watchlist:
-                results = researcher.web_search(t, top_k=1)
+            topics = sorted(watchlist)
+            # Background refresh: interactive requests go ahead of it
+            for t, results in zip(topics, researcher.web_search_many(topics, top_k=1, priority=PRIORITY_BACKGROUND)):
                 if results:
                     title = results[0].get("title", "")
                     print(f"Latest for '{t}': {title}")
                 else:
                     print(f"No new research found for '{t}'.")
         elif cmd.lower().startswith("graph "):
+            # Allow: graph <topic> [depth N]
             topic = cmd[len("graph "):].strip()
+            depth = 1
+            match = re.search(r"\s+depth\s+(\d+)$", topic)
+            if match:
+                depth = int(match.group(1))
+                topic = topic[:match.start()].strip()
             if not topic:
                 print("Please provide a topic to graph.")
                 continue
-            related = kg.related(topic)
+            if depth <= 1:
+                related = kg.iter_related(topic, columns=("subject", "predicate", "object"), limit=graph_limit + 1)
+            else:
+                related = kg.neighbors(topic, depth=depth, limit=graph_limit + 1)
             print(f"\n=== Knowledge Graph for '{topic}' ===")
-            if related:
-                for triple in related:
+            shown = 0
+            for triple in related:
+                if shown == graph_limit:
+                    print(f"... (showing first {graph_limit} triples)")
+                    break
+                print(f"{triple['subject']} --[{triple['predicate']}]--> {triple['object']}")
+                shown += 1
+            if not shown:
+                print("No related knowledge found.\n")
+        elif cmd.lower().startswith("path "):
+            # Allow: path <a> -> <b>
+            a, _, b = cmd[len("path "):].partition("->")
+            a, b = a.strip(), b.strip()
+            if not a or not b:
+                print("Usage: path <a> -> <b>")
+                continue
+            path = kg.shortest_path(a, b)
+            print(f"\n=== Path from '{a}' to '{b}' ===")
+            if path:
+                for triple in path:
                     print(f"{triple['subject']} --[{triple['predicate']}]--> {triple['object']}")
             else:
-                print("No related knowledge found.\n")
+                print("No connection found.\n")
         elif cmd.lower() == "suggest":
             cur = memory.conn.execute("SELECT metadata FROM knowledge ORDER BY ROWID DESC LIMIT 1")
             row = cur.fetchone()
@@ -525,7 +569,7 @@ def main():
             else:
                 print("No prior research found. Try 'research <topic>' first.")
         else:
-            print("Unknown command. Use 'research <topic>', 'recall <query>', 'watch <topic>', 'watchlist', 'suggest', or 'exit'.")
+            print("Unknown command. Use 'research <topic>', 'recall <query> [hybrid]', 'harvest <topic> [n] [cursor]', 'graph <topic> [depth N]', 'path <a> -> <b>', 'watch <topic>', 'watchlist', 'suggest', or 'exit'.")
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import asyncio
+import time
 from agents.types import AgentRole, Task, Message, TaskStatus
 from agents.planner.planner import PlannerAgent
 from agents.researcher.researcher import ResearcherAgent
@@ -5,6 +9,15 @@ from agents.memory.memory import MemoryAgent
 from agents.critic.critic import CriticAgent
 from agents.executor.executor import ExecutorAgent
 
+def message_task(message: Message) -> Task:
+    return Task(
+        id=message.id,
+        description=message.content,
+        role=message.recipient,
+        status=TaskStatus.PENDING,
+        context=message.payload
+    )
+
 class MessageBus:
     def __init__(self, agents):
         self.agents = agents
@@ -14,16 +27,193 @@ class MessageBus:
         self.log.append({"event": "send", "from": message.sender, "to": message.recipient, "content": message.content})
         agent = self.agents.get(message.recipient)
         if agent:
-            agent.receive_task(Task(
-                id="msg_" + message.content[:8],
-                description=message.content,
-                role=message.recipient,
-                status=TaskStatus.PENDING,
-                context=message.payload
-            ))
+            agent.receive_task(message_task(message))
 
-class Orchestrator:
+class MailboxStats:
     def __init__(self):
+        self.sent = 0
+        self.delivered = 0
+        self.errors = 0
+        self.blocked_sends = 0
+        self.max_depth = 0
+        self.total_send_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.total_handle_time = 0.0
+
+    def to_dict(self, depth: int) -> Dict[str, Any]:
+        return {
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "blocked_sends": self.blocked_sends,
+            "mean_send_wait": self.total_send_wait / self.sent if self.sent else 0.0,
+            "mean_latency": self.total_latency / self.delivered if self.delivered else 0.0,
+            "max_latency": self.max_latency,
+            "mean_handle_time": self.total_handle_time / self.delivered if self.delivered else 0.0,
+        }
+
+class AsyncMessageBus:
+    """
+    Asyncio message bus: every agent has a bounded mailbox drained by its own consumer
+    task, so a slow agent only delays its own messages. send() waits while the
+    recipient's mailbox is full (backpressure); request() also waits for the result,
+    matched to the message by its correlation id. Messages are delivered as tasks, and
+    a payload naming a "method" (with "args"/"kwargs") has that agent method called;
+    its return value is the result. Each agent's handlers run one at a time on that
+    agent's own worker thread, so blocking calls (network I/O, API backoff sleeps) stall
+    neither the event loop nor the other agents.
+    """
+
+    def __init__(self, agents: Dict[AgentRole, Any], maxsize: int = 100):
+        self.agents = agents
+        self.maxsize = maxsize
+        self.log: List[Dict[str, Any]] = []
+        self._mailboxes: Dict[AgentRole, asyncio.Queue] = {}
+        self._consumers: Dict[AgentRole, asyncio.Task] = {}
+        self._executors: Dict[AgentRole, ThreadPoolExecutor] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._stats = {role: MailboxStats() for role in agents}
+
+    async def start(self) -> None:
+        if self._consumers:
+            return
+        for role in self.agents:
+            self._mailboxes[role] = asyncio.Queue(maxsize=self.maxsize)
+            self._executors[role] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bus-{role.value}")
+            self._consumers[role] = asyncio.create_task(self._consume(role))
+
+    async def stop(self) -> None:
+        # Deliver everything already queued, then shut the consumers down
+        for mailbox in self._mailboxes.values():
+            await mailbox.join()
+        for consumer in self._consumers.values():
+            consumer.cancel()
+        await asyncio.gather(*self._consumers.values(), return_exceptions=True)
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+        self._consumers.clear()
+        self._executors.clear()
+        self._mailboxes.clear()
+
+    async def __aenter__(self) -> "AsyncMessageBus":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def _mailbox(self, message: Message) -> asyncio.Queue:
+        mailbox = self._mailboxes.get(message.recipient)
+        if mailbox is None:
+            raise KeyError(f"No running mailbox for {message.recipient}")
+        return mailbox
+
+    def _sent(self, message: Message, mailbox: asyncio.Queue, send_wait: float) -> None:
+        stats = self._stats[message.recipient]
+        stats.sent += 1
+        stats.total_send_wait += send_wait
+        stats.max_depth = max(stats.max_depth, mailbox.qsize())
+        self.log.append({"event": "send", "id": message.id, "correlation_id": message.correlation_id,
+                         "from": message.sender, "to": message.recipient, "content": message.content})
+
+    async def send(self, message: Message, timeout: Optional[float] = None) -> None:
+        """
+        Queue a message for its recipient, waiting while the mailbox is full. Raises
+        asyncio.TimeoutError if no slot frees up within timeout seconds.
+        """
+        mailbox = self._mailbox(message)
+        if mailbox.full():
+            self._stats[message.recipient].blocked_sends += 1
+        start = time.monotonic()
+        await asyncio.wait_for(mailbox.put((start, message)), timeout)
+        self._sent(message, mailbox, time.monotonic() - start)
+
+    def send_nowait(self, message: Message) -> None:
+        """
+        Queue a message without waiting; raises asyncio.QueueFull if the mailbox is full.
+        """
+        mailbox = self._mailbox(message)
+        try:
+            mailbox.put_nowait((time.monotonic(), message))
+        except asyncio.QueueFull:
+            self._stats[message.recipient].blocked_sends += 1
+            raise
+        self._sent(message, mailbox, 0.0)
+
+    async def request(self, message: Message, timeout: Optional[float] = None) -> Any:
+        """
+        Send a message and wait for its result (or the handler's exception).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message.correlation_id] = future
+        try:
+            return await asyncio.wait_for(self._send_and_wait(message, future), timeout)
+        finally:
+            self._pending.pop(message.correlation_id, None)
+
+    async def _send_and_wait(self, message: Message, future: asyncio.Future) -> Any:
+        await self.send(message)
+        return await future
+
+    @staticmethod
+    def _handle(agent: Any, message: Message) -> Any:
+        agent.receive_task(message_task(message))
+        method = message.payload.get("method")
+        if method is None:
+            return None
+        return getattr(agent, method)(*message.payload.get("args", ()), **message.payload.get("kwargs", {}))
+
+    async def _consume(self, role: AgentRole) -> None:
+        mailbox = self._mailboxes[role]
+        agent = self.agents[role]
+        stats = self._stats[role]
+        executor = self._executors[role]
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, message = await mailbox.get()
+            started = time.monotonic()
+            latency = started - enqueued_at
+            stats.delivered += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+            result = error = None
+            try:
+                try:
+                    result = await loop.run_in_executor(executor, self._handle, agent, message)
+                except Exception as e:
+                    error = e
+                    stats.errors += 1
+                    self.log.append({"event": "handler_error", "id": message.id, "to": role, "error": str(e)})
+                stats.total_handle_time += time.monotonic() - started
+                future = self._pending.get(message.correlation_id)
+                if future is not None and not future.done():
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+                if message.reply_to is not None and error is None and message.reply_to in self._mailboxes:
+                    await self.send(Message(
+                        sender=role,
+                        recipient=message.reply_to,
+                        content=f"Reply to {message.id}",
+                        payload={"result": result},
+                        correlation_id=message.correlation_id
+                    ))
+            finally:
+                # Only now is the message done, so stop() also waits for its reply
+                mailbox.task_done()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            role.value: stats.to_dict(self._mailboxes[role].qsize() if role in self._mailboxes else 0)
+            for role, stats in self._stats.items()
+        }
+
+class Orchestrator:
+    def __init__(self, mailbox_size: int = 100):
         self.planner = PlannerAgent()
         self.researcher = ResearcherAgent()
         self.memory = MemoryAgent()
@@ -36,45 +226,57 @@ class Orchestrator:
             AgentRole.CRITIC: self.critic,
             AgentRole.EXECUTOR: self.executor,
         }
-        self.bus = MessageBus(self.agents)
+        self.bus = AsyncMessageBus(self.agents, maxsize=mailbox_size)
 
-    def run_demo_workflow(self):
-        # Step 1: Planner receives a high-level goal
-        goal_task = Task(
-            id="goal_1",
-            description="Summarize top 5 AI papers and store in memory.",
-            role=AgentRole.PLANNER
+    def _call(self, recipient: AgentRole, content: str, method: str, *args, **kwargs) -> Message:
+        # Message from the planner asking recipient to run one of its methods
+        return Message(
+            sender=AgentRole.PLANNER,
+            recipient=recipient,
+            content=content,
+            payload={"method": method, "args": args, "kwargs": kwargs}
         )
-        self.planner.receive_task(goal_task)
 
-        # Step 2: Planner decomposes and assigns a research task
-        research_task = Task(
-            id="research_1",
-            description="Find top 5 AI papers.",
-            role=AgentRole.RESEARCHER
-        )
-        self.planner.assign_task(research_task, AgentRole.RESEARCHER)
-        self.researcher.receive_task(research_task)
+    def run_demo_workflow(self):
+        return asyncio.run(self.run_demo_workflow_async())
 
-        # Step 3: Researcher performs real web search and synthesizes digest
-        results = self.researcher.web_search("top AI papers", top_k=5)
-        digest = self.researcher.synthesize_digest(results)
+    async def run_demo_workflow_async(self):
+        async with self.bus:
+            # Step 1: Planner receives a high-level goal
+            goal_task = Task(
+                id="goal_1",
+                description="Summarize top 5 AI papers and store in memory.",
+                role=AgentRole.PLANNER
+            )
+            self.planner.receive_task(goal_task)
 
-        # Step 4: Memory agent stores the digest
-        item_id = self.memory.embed_and_store(digest, metadata={"source": "researcher", "topic": "AI papers"})
+            # Step 2: Planner decomposes and assigns a research task
+            research = self._call(AgentRole.RESEARCHER, "Find top 5 AI papers.", "web_search", "top AI papers", top_k=5)
+            self.planner.assign_task(message_task(research), AgentRole.RESEARCHER)
 
-        # Step 5: Quick-Recall: perform semantic search for "AI papers"
-        recall_results = self.memory.semantic_search("AI papers", top_k=1)
-        recalled_content = recall_results[0].content if recall_results else None
+            # Step 3: Researcher performs real web search and synthesizes digest (on its own thread)
+            results = await self.bus.request(research)
+            digest = await self.bus.request(
+                self._call(AgentRole.RESEARCHER, "Synthesize a digest of the papers.", "synthesize_digest", results)
+            )
 
-        # Step 6: Critic reviews the process
-        outcome = {"task": "research_1", "result": digest}
-        self.critic.monitor_outcome(outcome)
-        recommendation = self.critic.trigger_reflection({"task": "research_1", "result": digest})
+            # Steps 4-6 run concurrently: the memory agent stores the digest and then serves the
+            # quick-recall search (its mailbox is FIFO), while the critic reviews the process
+            outcome = {"task": research.id, "result": digest}
+            item_id, recall_results, _, recommendation = await asyncio.gather(
+                self.bus.request(self._call(
+                    AgentRole.MEMORY, "Store the digest.", "embed_and_store", digest,
+                    metadata={"source": "researcher", "topic": "AI papers"}
+                )),
+                self.bus.request(self._call(AgentRole.MEMORY, "Recall AI papers.", "semantic_search", "AI papers", top_k=1)),
+                self.bus.request(self._call(AgentRole.CRITIC, "Monitor the research outcome.", "monitor_outcome", outcome)),
+                self.bus.request(self._call(AgentRole.CRITIC, "Reflect on the research.", "trigger_reflection", outcome)),
+            )
+            recalled_content = recall_results[0].content if recall_results else None
 
-        # Step 7: Executor could be triggered for further actions (stub)
-        action = {"type": "notify", "message": "Digest stored in memory as " + item_id}
-        self.executor.execute_action(action)
+            # Step 7: Executor could be triggered for further actions (stub); delivered before the bus stops
+            action = {"type": "notify", "message": "Digest stored in memory as " + item_id}
+            await self.bus.send(self._call(AgentRole.EXECUTOR, "Notify that the digest is stored.", "execute_action", action))
 
         # Log summary
         return {
@@ -84,6 +286,7 @@ class Orchestrator:
             "critic_log": self.critic.log,
             "executor_log": self.executor.log,
             "message_bus_log": self.bus.log,
+            "message_bus_stats": self.bus.stats(),
             "final_digest": digest,
             "memory_item_id": item_id,
             "critic_recommendation": recommendation,